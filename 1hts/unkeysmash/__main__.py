@@ -1,4 +1,6 @@
 import tkinter as tk
+import multiprocessing
+import os
 import sys
 import traceback
 from Xlib.display import Display
@@ -7,7 +9,14 @@ from Xlib import XK
 from evdev import ecodes, UInput
 from .vocab import Vocab
 from .suggester import Suggester
+from .batch_scoring import BatchScorer
+from .suggestion_cache import SuggestionCache
+from .suggestion_worker import SuggestionWorker
+from .vocab_index import DeletionIndex, TieredIndex
+from .vocab_journal import VocabJournal
 from .edit_sequences import EditSequencesConfig
+from .edit_scores import get_edit_score
+from .substitution_costs import SubstitutionCosts
 from ..lib1hts.aliasmap import AliasMap
 
 
@@ -46,6 +55,25 @@ class TypingTracker:
         self.typing_buffer = []
         self.cursor_idx = 0
         self.selection_range_chars = 0
+        # buffer indices just past each word already learned, kept in step
+        # with edits, so finishing a word again doesn't relearn it
+        self._learned_ends = set()
+
+    def _word_end(self, idx):
+        # index just past the word at idx, or idx itself if there is none
+        while idx < len(self.typing_buffer) and not self.typing_buffer[idx].isspace():
+            idx += 1
+        return idx
+
+    def _edit_learned_ends(self, idx, char, shift):
+        # before char is inserted at (shift 1) or deleted from (shift -1)
+        # idx. Editing a word forgets it, so it is learned again once it
+        # is finished.
+        if not char.isspace():
+            self._learned_ends.discard(self._word_end(idx))
+        self._learned_ends = set(
+            end + shift if end > idx else end for end in self._learned_ends
+        )
 
     def shift_cursor_right(self):
         self.cursor_idx += 1
@@ -86,6 +114,9 @@ class TypingTracker:
 
     def forward_delete(self):
         if self.cursor_idx != len(self.typing_buffer):
+            self._edit_learned_ends(
+                self.cursor_idx, self.typing_buffer[self.cursor_idx], -1
+            )
             self.typing_buffer = (
                 self.typing_buffer[0 : self.cursor_idx]
                 + self.typing_buffer[self.cursor_idx + 1 :]
@@ -93,6 +124,9 @@ class TypingTracker:
 
     def backward_delete(self):
         if self.cursor_idx != 0:
+            self._edit_learned_ends(
+                self.cursor_idx - 1, self.typing_buffer[self.cursor_idx - 1], -1
+            )
             self.typing_buffer = (
                 self.typing_buffer[0 : self.cursor_idx - 1]
                 + self.typing_buffer[self.cursor_idx :]
@@ -145,6 +179,19 @@ class TypingTracker:
         return self.modifier_map[XK.XK_Shift_L] or self.modifier_map[XK.XK_Shift_R]
 
     def type_char(self, char):
+        if (
+            char[0].isspace()
+            and self._language_model is not None
+            and self.cursor_idx not in self._learned_ends
+        ):
+            # typing whitespace finishes the word before the cursor
+            finished_word = get_last_word(
+                "".join(self.typing_buffer[: self.cursor_idx])
+            )
+            if len(finished_word) != 0:
+                self._language_model.learn_word(finished_word)
+                self._learned_ends.add(self.cursor_idx)
+        self._edit_learned_ends(self.cursor_idx, char[0], 1)
         self.typing_buffer = (
             self.typing_buffer[0 : self.cursor_idx]
             + [char[0]]
@@ -159,6 +206,20 @@ class TypingTracker:
         )
 
 
+class WorkerLanguageModel:
+    """
+    Learns words into a VocabJournal on the suggestion worker's thread, so
+    the vocab never changes while a suggestion is being computed
+    """
+
+    def __init__(self, journal, suggestion_worker):
+        self.journal = journal
+        self.suggestion_worker = suggestion_worker
+
+    def learn_word(self, word):
+        self.suggestion_worker.update_vocab(lambda: self.journal.learn_word(word))
+
+
 def full_stack():
     exc = sys.exc_info()[0]
     stack = traceback.extract_stack()[:-1]  # last one would be full_stack()
@@ -211,8 +272,9 @@ class SuggestionLabel:
 
 
 def get_last_word(buffer):
-    lastspaceidx = buffer.rfind(" ")
-    lastwordstartidx = 0 if lastspaceidx == -1 else lastspaceidx + 1
+    lastwordstartidx = len(buffer)
+    while lastwordstartidx != 0 and not buffer[lastwordstartidx - 1].isspace():
+        lastwordstartidx -= 1
     return buffer[lastwordstartidx:]
 
 
@@ -264,9 +326,11 @@ def main(argv):
     extension_info = display.query_extension("XInputExtension")
     xinput_major = extension_info.major_opcode
 
-    typing_tracker = TypingTracker(None)
-
-    aliasing_map = AliasMap(open("halfquerty-v2.bin", "rb").read())
+    keymap_bin = open("halfquerty-v2.bin", "rb").read()
+    aliasing_map = AliasMap(keymap_bin)
+    substitution_costs = SubstitutionCosts.load_or_build(
+        "halfquerty-v2.subcosts.json", keymap_bin, aliasing_map
+    )
 
     version_info = display.xinput_query_version()
     print(
@@ -335,10 +399,55 @@ def main(argv):
     after_label.pack(side=tk.LEFT)
     suggestion_container.pack(side=tk.BOTTOM)
 
-    vocab = Vocab.loads(open("vocab.json", "r").read())
+    if os.path.exists("vocab.bin"):
+        vocab = Vocab.load_binary("vocab.bin")
+    else:
+        vocab = Vocab.loads(open("vocab.json", "r").read())
+    # words learned while typing, kept apart from vocab.bin so rebuilding it
+    # from the corpus doesn't lose them
+    journal = VocabJournal(vocab, "vocab.learned.json", "vocab.journal")
     ui = UInput()
 
-    suggester = Suggester(vocab, edit_sequence_config=EditSequencesConfig())
+    suggester = Suggester(
+        vocab,
+        edit_sequence_config=EditSequencesConfig(substitution_costs=substitution_costs),
+        edit_score_engine=get_edit_score,
+        candidate_index=TieredIndex(vocab),
+        typo_index=DeletionIndex.load_or_build("vocab.deletes.json", vocab),
+        suggestion_cache=SuggestionCache(max_bytes=4 << 20),
+        # spawned rather than forked, since this process holds threads and
+        # an X connection by the time the pool starts
+        batch_scorer=BatchScorer(mp_context=multiprocessing.get_context("spawn")),
+    )
+
+    # the word the suggestion labels are for, and the suggestions on them
+    shown_word = ""
+    shown_suggestions = []
+    requested_word = None
+
+    def render_suggestions():
+        while len(shown_suggestions) > len(suggestion_labels):
+            l = SuggestionLabel(
+                suggestion_container,
+            )
+            suggestion_labels.append(l)
+
+        while len(shown_suggestions) < len(suggestion_labels):
+            l = suggestion_labels.pop()
+            l.dispose()
+
+        for i, (sugg, label) in enumerate(zip(shown_suggestions, suggestion_labels)):
+            label.update(sugg, i == suggestion_idx)
+
+    def on_suggestions(word_prefix, suggestions):
+        nonlocal shown_word, shown_suggestions
+        shown_word = word_prefix
+        shown_suggestions = suggestions
+        render_suggestions()
+
+    suggestion_worker = SuggestionWorker(suggester, win, on_suggestions)
+    language_model = WorkerLanguageModel(journal, suggestion_worker)
+    typing_tracker = TypingTracker(language_model)
 
     try:
         while True:
@@ -361,15 +470,21 @@ def main(argv):
                     elif keycode == STEP_PREV:
                         suggestion_idx = max(suggestion_idx - 1, 0)
                     elif keycode == SELECT_ACTIVE:
-                        # correct the word to the suggestion
+                        # correct the word to the suggestion on screen
                         before_text, after_text = typing_tracker.get_text()
                         last_word = get_last_word(before_text)
 
-                        suggestions = suggester.get_prefix_suggestions(lastword)
-
-                        if suggestion_idx < len(suggestions):
+                        if last_word == shown_word and suggestion_idx < len(
+                            shown_suggestions
+                        ):
+                            # the correction comes back through the typing
+                            # tracker as keypresses, so the chosen word is
+                            # learned when it is finished like any other
                             correct_typing_buffer(
-                                display, ui, last_word, suggestions[suggestion_idx]
+                                display,
+                                ui,
+                                last_word,
+                                shown_suggestions[suggestion_idx],
                             )
 
                     else:
@@ -393,19 +508,10 @@ def main(argv):
                 after_txt_var.set(after_text)
 
                 lastword = get_last_word(before_text)
-                suggestions = suggester.get_prefix_suggestions(lastword)
-                while len(suggestions) > len(suggestion_labels):
-                    l = SuggestionLabel(
-                        suggestion_container,
-                    )
-                    suggestion_labels.append(l)
-
-                while len(suggestions) < len(suggestion_labels):
-                    l = suggestion_labels.pop()
-                    l.dispose()
-
-                for i, (sugg, label) in enumerate(zip(suggestions, suggestion_labels)):
-                    label.update(sugg, i == suggestion_idx)
+                if lastword != requested_word:
+                    requested_word = lastword
+                    suggestion_worker.request(lastword)
+                render_suggestions()
             win.update_idletasks()
             win.update()
     except KeyboardInterrupt as e:
@@ -414,6 +520,8 @@ def main(argv):
         print(e)
         print(full_stack())
     finally:
+        suggestion_worker.stop()
+        suggester.batch_scorer.shutdown()
         win.destroy()
         return 1
 
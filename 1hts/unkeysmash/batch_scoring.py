@@ -0,0 +1,113 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from .suggester import Suggester
+
+# Suggester rebuilt once in each pool worker from the parent's vocab, so
+# scoring calls only have to send the fragment and words over
+_worker_suggester = None
+
+
+def _init_worker(vocab, edit_sequence_config, edit_score_engine):
+    global _worker_suggester
+    _worker_suggester = Suggester(
+        vocab, edit_sequence_config, edit_score_engine=edit_score_engine
+    )
+
+
+def _score_words(word_prefix, words, learned_start, learned):
+    # learned is the words the parent has learned since the pool started,
+    # which this worker's copy of the vocab may have some of already
+    vocab = _worker_suggester.vocab
+    for word, count in learned[vocab.learned_ct() - learned_start :]:
+        vocab.learn_word(word, count)
+    return _worker_suggester.score_batch(word_prefix, words)
+
+
+class BatchScorer:
+    """
+    Scores large batches of candidates for Suggester.score_batch across a
+    process pool.
+
+    The pool is started on first use, with the suggester's vocab, config
+    and edit score engine handed to each worker once, and restarted if the
+    vocab changes. Words the vocab learns one at a time are sent along with
+    each batch instead, until there are more than max_learned of them.
+    Batches smaller than inline_threshold aren't worth the round trip and
+    are left for the suggester to score inline.
+    """
+
+    def __init__(
+        self,
+        max_workers=None,
+        inline_threshold=2000,
+        chunk_size=500,
+        mp_context=None,
+        max_learned=1000,
+    ):
+        self.max_workers = max_workers
+        self.inline_threshold = inline_threshold
+        self.chunk_size = chunk_size
+        self.mp_context = mp_context
+        self.max_learned = max_learned
+        self._executor = None
+        self._executor_key = None
+        # vocab.learned_ct() when the pool started
+        self._learned_start = 0
+
+    def _get_executor(self, suggester):
+        key = (
+            id(suggester),
+            suggester.vocab.generation,
+            suggester._config_key(),
+            suggester.edit_score_engine,
+        )
+        learned_ct = suggester.vocab.learned_ct()
+        if self._executor is not None and (
+            key != self._executor_key
+            or learned_ct - self._learned_start > self.max_learned
+            # the vocab's log no longer goes back to when the pool started
+            or suggester.vocab.learned_since(self._learned_start) is None
+        ):
+            self.shutdown()
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=self.mp_context,
+                initializer=_init_worker,
+                initargs=(
+                    suggester.vocab,
+                    suggester.edit_sequence_config,
+                    suggester.edit_score_engine,
+                ),
+            )
+            self._executor_key = key
+            self._learned_start = learned_ct
+        return self._executor
+
+    def score(self, suggester, word_prefix, words):
+        """
+        Get suggester.prefix_match_distance for each of words, computed in
+        chunks across the pool
+        """
+        executor = self._get_executor(suggester)
+        chunks = [
+            words[i : i + self.chunk_size]
+            for i in range(0, len(words), self.chunk_size)
+        ]
+        learned = suggester.vocab.learned_since(self._learned_start)
+        distances = []
+        for chunk_distances in executor.map(
+            _score_words,
+            repeat(word_prefix),
+            chunks,
+            repeat(self._learned_start),
+            repeat(learned),
+        ):
+            distances.extend(chunk_distances)
+        return distances
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._executor_key = None
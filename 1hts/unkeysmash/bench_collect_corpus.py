@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+
+# Time collect_corpus over a synthetic corpus of small markdown files with
+# different --jobs.
+#
+# usage: python -m 1hts.unkeysmash.bench_collect_corpus [file count] [jobs...]
+
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from itertools import accumulate
+from .bench_substring_index import synthetic_words
+
+COLLECT_CORPUS = os.path.join(os.path.dirname(__file__), "collect_corpus.py")
+
+
+def write_corpus(rng, corpus_dir, file_count, words_per_file=200):
+    words = synthetic_words(rng, 20_000)
+    # zipf-ish word frequencies, like real notes
+    cum_weights = list(accumulate(1 / (rank + 1) for rank in range(len(words))))
+    for file_idx in range(file_count):
+        subdir = os.path.join(corpus_dir, "dir%d" % (file_idx // 500))
+        os.makedirs(subdir, exist_ok=True)
+        lines = []
+        for _ in range(words_per_file // 10):
+            lines.append(
+                " ".join(rng.choices(words, cum_weights=cum_weights, k=10)) + "."
+            )
+        with open(os.path.join(subdir, "note%d.md" % file_idx), "w") as md_file:
+            md_file.write("# Note %d\n\n" % file_idx + "\n".join(lines))
+
+
+def time_collect(corpus_dir, jobs):
+    with tempfile.TemporaryDirectory() as out_dir:
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, COLLECT_CORPUS, "--jobs", str(jobs), corpus_dir],
+            cwd=out_dir,
+            stdout=subprocess.DEVNULL,
+            check=True,
+        )
+        return time.perf_counter() - start
+
+
+def main(argv):
+    file_count = int(argv[1]) if len(argv) > 1 else 10_000
+    jobs_counts = [int(arg) for arg in argv[2:]] or sorted(
+        set([1, 2, 4, os.cpu_count()])
+    )
+    rng = random.Random(0)
+
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        write_corpus(rng, corpus_dir, file_count)
+        print("%8s %10s" % ("jobs", "seconds"))
+        for jobs in jobs_counts:
+            print("%8d %10.2f" % (jobs, time_collect(corpus_dir, jobs)))
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
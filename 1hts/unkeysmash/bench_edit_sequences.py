@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+# Compare the recursive get_edit_sequences walk against the iterative one.
+#
+# usage: python -m 1hts.unkeysmash.bench_edit_sequences [word lengths...]
+
+import random
+import sys
+import time
+from .bench_substring_index import LETTERS, LETTER_WEIGHTS
+from .edit_sequences import get_edit_sequences, get_edit_sequences_iterative
+
+
+def typo_pairs(rng, word_len, count):
+    # words with roughly one substituted, dropped or doubled letter per 8
+    pairs = []
+    for _ in range(count):
+        target = "".join(rng.choices(LETTERS, LETTER_WEIGHTS, k=word_len))
+        source = list(target)
+        for _ in range(max(1, word_len // 8)):
+            idx = rng.randrange(len(source))
+            typo = rng.randint(0, 2)
+            if typo == 0:
+                source[idx] = rng.choice(LETTERS)
+            elif typo == 1 and len(source) > 1:
+                del source[idx]
+            else:
+                source.insert(idx, source[idx])
+        pairs.append((target, "".join(source)))
+    return pairs
+
+
+def time_walk(walk, pairs):
+    start = time.perf_counter()
+    for target, source in pairs:
+        walk(target, source)
+    return (time.perf_counter() - start) / len(pairs)
+
+
+def main(argv):
+    lengths = [int(arg) for arg in argv[1:]] or [3, 5, 10, 15, 20, 25, 30, 35, 40]
+    rng = random.Random(0)
+
+    print("%8s %16s %16s %10s" % ("length", "recursive ms", "iterative ms", "speedup"))
+    for word_len in lengths:
+        pairs = typo_pairs(rng, word_len, 10)
+        recursive_time = time_walk(get_edit_sequences, pairs)
+        iterative_time = time_walk(get_edit_sequences_iterative, pairs)
+        print(
+            "%8d %16.2f %16.2f %9.2fx"
+            % (
+                word_len,
+                recursive_time * 1e3,
+                iterative_time * 1e3,
+                recursive_time / iterative_time,
+            )
+        )
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
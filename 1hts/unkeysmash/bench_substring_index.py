@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+# Compare TrigramIndex lookups against the linear vocab scan.
+#
+# usage: python -m 1hts.unkeysmash.bench_substring_index [word counts...]
+
+import random
+import sys
+import time
+from .vocab_index import TrigramIndex
+
+LETTERS = "etaoinshrdlcumwfgypbvkjxqz"
+LETTER_WEIGHTS = [26 - i for i in range(len(LETTERS))]
+
+
+def synthetic_words(rng, count):
+    words = set()
+    while len(words) < count:
+        word_len = rng.randint(3, 12)
+        words.add("".join(rng.choices(LETTERS, LETTER_WEIGHTS, k=word_len)))
+    return list(words)
+
+
+def sample_fragments(rng, words, count):
+    fragments = []
+    for _ in range(count):
+        word = rng.choice(words)
+        frag_len = rng.randint(1, min(5, len(word)))
+        start = rng.randint(0, len(word) - frag_len)
+        fragments.append(word[start : start + frag_len])
+    return fragments
+
+
+def time_queries(lookup, fragments):
+    start = time.perf_counter()
+    for fragment in fragments:
+        lookup(fragment)
+    return (time.perf_counter() - start) / len(fragments)
+
+
+def main(argv):
+    sizes = [int(arg) for arg in argv[1:]] or [10_000, 100_000, 1_000_000]
+    rng = random.Random(0)
+
+    print(
+        "%10s %12s %14s %14s %10s"
+        % ("words", "build s", "scan us/q", "index us/q", "speedup")
+    )
+    for size in sizes:
+        words = synthetic_words(rng, size)
+        fragments = sample_fragments(rng, words, 200)
+
+        start = time.perf_counter()
+        index = TrigramIndex(words)
+        build_time = time.perf_counter() - start
+
+        scan_time = time_queries(
+            lambda fragment: [w for w in words if fragment in w], fragments[:20]
+        )
+        index_time = time_queries(index.candidates, fragments)
+
+        print(
+            "%10d %12.2f %14.1f %14.1f %9.1fx"
+            % (
+                size,
+                build_time,
+                scan_time * 1e6,
+                index_time * 1e6,
+                scan_time / index_time,
+            )
+        )
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,143 @@
+from .edit_sequences import EditSequencesConfig
+
+# Bit-parallel (Myers / Hyyro) unit cost edit distance.
+#
+# The DP column for the whole target word is packed into the bits of an
+# int, so comparing a typed fragment against a target costs a handful of
+# int ops per fragment character rather than a walk over every cell.
+# Python ints are unbounded, but targets under 64 characters keep every
+# op on a single machine word.
+
+
+def char_masks(word):
+    """
+    Map each character of word to a bitmask of the positions it occurs at
+    """
+    masks = dict()
+    for i, c in enumerate(word):
+        masks[c] = masks.get(c, 0) | (1 << i)
+    return masks
+
+
+def bitparallel_distance(masks, target_len, source):
+    """
+    Get the levenshtein distance between a target word, given by its
+    char_masks and length, and source
+    """
+    if target_len == 0:
+        return len(source)
+
+    all_bits = (1 << target_len) - 1
+    high_bit = 1 << (target_len - 1)
+    vert_pos = all_bits
+    vert_neg = 0
+    distance = target_len
+
+    for c in source:
+        eq = masks.get(c, 0)
+        x_vert = eq | vert_neg
+        x_horiz = (((eq & vert_pos) + vert_pos) ^ vert_pos) | eq
+        horiz_pos = vert_neg | (~(x_horiz | vert_pos) & all_bits)
+        horiz_neg = vert_pos & x_horiz
+
+        if horiz_pos & high_bit:
+            distance += 1
+        elif horiz_neg & high_bit:
+            distance -= 1
+
+        # the top row of the DP is 0..len(source), so each step
+        # shifts in a positive horizontal delta
+        horiz_pos = ((horiz_pos << 1) | 1) & all_bits
+        horiz_neg = (horiz_neg << 1) & all_bits
+        vert_pos = horiz_neg | (~(x_vert | horiz_pos) & all_bits)
+        vert_neg = horiz_pos & x_vert
+
+    return distance
+
+
+def bitparallel_prefix_distance(masks, target_len, source):
+    """
+    Get the smallest levenshtein distance between a target word, given by
+    its char_masks and length, and any prefix of source
+    """
+    if target_len == 0:
+        return 0
+
+    all_bits = (1 << target_len) - 1
+    high_bit = 1 << (target_len - 1)
+    vert_pos = all_bits
+    vert_neg = 0
+    distance = target_len
+    min_distance = distance
+
+    for c in source:
+        eq = masks.get(c, 0)
+        x_vert = eq | vert_neg
+        x_horiz = (((eq & vert_pos) + vert_pos) ^ vert_pos) | eq
+        horiz_pos = vert_neg | (~(x_horiz | vert_pos) & all_bits)
+        horiz_neg = vert_pos & x_horiz
+
+        if horiz_pos & high_bit:
+            distance += 1
+        elif horiz_neg & high_bit:
+            distance -= 1
+            if distance < min_distance:
+                min_distance = distance
+
+        horiz_pos = ((horiz_pos << 1) | 1) & all_bits
+        horiz_neg = (horiz_neg << 1) & all_bits
+        vert_pos = horiz_neg | (~(x_vert | horiz_pos) & all_bits)
+        vert_neg = horiz_pos & x_vert
+
+    return min_distance
+
+
+class BitParallelScorer:
+    """
+    Edit score engine for Suggester that scores by levenshtein distance,
+    keeping the char_masks of each target word it sees so repeat
+    comparisons against the same word only pay for the bit-parallel walk.
+
+    Masks are kept per whole word. Suggester scores fragments against the
+    first few characters of each word through prefix_score, which reuses
+    the whole word's masks, since the walk ignores any bit at or above the
+    length it is given.
+    """
+
+    def __init__(self, words=()):
+        self.masks = dict()
+        for word in words:
+            self.precompute(word)
+
+    def precompute(self, word):
+        masks = self.masks.get(word)
+        if masks is None:
+            masks = char_masks(word)
+            self.masks[word] = masks
+        return masks
+
+    def min_score(self, source_len, config=EditSequencesConfig()):
+        return 0
+
+    def distance(self, target, source, target_len=None):
+        if target_len is None:
+            target_len = len(target)
+        return bitparallel_distance(self.precompute(target), target_len, source)
+
+    def prefix_score(self, target, prefix_len, source, config=EditSequencesConfig()):
+        """
+        Get the score of target[:prefix_len] against source, from the
+        masks of all of target
+        """
+        target_len = min(prefix_len, len(target))
+        if target_len == 0 and len(source) == 0:
+            return None
+        if (
+            config.walk_diff_cutoff is not None
+            and abs(target_len - len(source)) > config.walk_diff_cutoff
+        ):
+            return None
+        return self.distance(target, source, target_len)
+
+    def __call__(self, target, source, config=EditSequencesConfig()):
+        return self.prefix_score(target, len(target), source, config)
@@ -0,0 +1,106 @@
+import random
+import unittest
+from .bitparallel import (
+    BitParallelScorer,
+    bitparallel_distance,
+    bitparallel_prefix_distance,
+    char_masks,
+)
+from .edit_sequences import EditSequencesConfig, get_edit_sequences
+
+
+def reference_distance(target, source):
+    prev = list(range(len(source) + 1))
+    for i in range(1, len(target) + 1):
+        cur = [i] + [0] * len(source)
+        for j in range(1, len(source) + 1):
+            cur[j] = min(
+                prev[j] + 1,
+                cur[j - 1] + 1,
+                prev[j - 1] + (target[i - 1] != source[j - 1]),
+            )
+        prev = cur
+    return prev[len(source)]
+
+
+def sequence_distance(edit_sequence):
+    return sum(len(seg[1]) for seg in edit_sequence if seg[0] != "MAT")
+
+
+def distance(target, source):
+    return bitparallel_distance(char_masks(target), len(target), source)
+
+
+class BitParallelTest(unittest.TestCase):
+    def test_base_cases(self):
+        self.assertEqual(distance("abcd", "abcd"), 0)
+        self.assertEqual(distance("abcd", ""), 4)
+        self.assertEqual(distance("", "abcd"), 4)
+        self.assertEqual(distance("", ""), 0)
+
+    def test_matches_edit_sequences(self):
+        for target, source in [
+            ("ae", "ac"),
+            ("helo", "helw"),
+            ("abcd", "ab_d"),
+            ("abcd", "~bcd"),
+            ("abcd", "~b_d"),
+            ("qw'reall", "we're all"),
+        ]:
+            self.assertEqual(
+                distance(target, source),
+                min(
+                    sequence_distance(seq) for seq in get_edit_sequences(target, source)
+                ),
+                (target, source),
+            )
+
+    def test_randomized_differential(self):
+        rng = random.Random(1)
+        for _ in range(500):
+            target = "".join(rng.choice("abcd") for _ in range(rng.randint(0, 70)))
+            source = "".join(rng.choice("abcd") for _ in range(rng.randint(0, 70)))
+            self.assertEqual(
+                distance(target, source),
+                reference_distance(target, source),
+                (target, source),
+            )
+
+    def test_prefix_distance_randomized_differential(self):
+        rng = random.Random(2)
+        for _ in range(300):
+            target = "".join(rng.choice("abcd") for _ in range(rng.randint(0, 10)))
+            source = "".join(rng.choice("abcd") for _ in range(rng.randint(0, 14)))
+            self.assertEqual(
+                bitparallel_prefix_distance(char_masks(target), len(target), source),
+                min(
+                    reference_distance(target, source[:l])
+                    for l in range(len(source) + 1)
+                ),
+                (target, source),
+            )
+
+    def test_scorer_walk_cutoff(self):
+        scorer = BitParallelScorer(["helo"])
+        config = EditSequencesConfig(walk_diff_cutoff=2)
+        self.assertEqual(scorer("helo", "helw", config), 1)
+        self.assertEqual(scorer("helo", "h", config), None)
+        self.assertEqual(scorer("", "", config), None)
+
+    def test_scorer_prefix_score_uses_word_masks(self):
+        words = ["hello", "help", "yellow"]
+        scorer = BitParallelScorer(words)
+        config = EditSequencesConfig(walk_diff_cutoff=2)
+        for word in words:
+            for source in ["h", "hel", "yelp", "hxllo"]:
+                self.assertEqual(
+                    scorer.prefix_score(word, len(source), source, config),
+                    BitParallelScorer()(word[: len(source)], source, config),
+                    (word, source),
+                )
+        # only the whole words are kept, not each prefix scored against
+        self.assertEqual(set(scorer.masks), set(words))
+
+
+if __name__ == "__main__":
+    unittest.main()
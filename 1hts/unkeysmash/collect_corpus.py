@@ -1,8 +1,13 @@
 #!/usr/bin/env python3
 
+import argparse
+import json
 import sys
 import os, fnmatch
-from vocab import Vocab
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from vocab import Vocab, count_md_file
+
 
 # via https://code.activestate.com/recipes/499305-locating-files-throughout-a-directory-tree/
 def locate(pattern, root=os.curdir):
@@ -14,25 +19,174 @@ def locate(pattern, root=os.curdir):
             yield os.path.join(path, filename)
 
 
+def count_md_files(md_paths):
+    file_counts = []
+    for md_path in md_paths:
+        with open(md_path, "r") as md_file:
+            print("collecting vocab from", md_path)
+            file_counts.append(count_md_file(md_file))
+    return file_counts
+
+
+def collect_counts(md_paths, jobs=1, chunk_size=64):
+    """
+    Count the words in each of md_paths, splitting the files into chunks
+    across jobs worker processes
+    """
+    if jobs == 1:
+        return count_md_files(md_paths)
+
+    chunks = [md_paths[i : i + chunk_size] for i in range(0, len(md_paths), chunk_size)]
+    file_counts = []
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for chunk_counts in executor.map(count_md_files, chunks):
+            file_counts.extend(chunk_counts)
+    return file_counts
+
+
+class Manifest:
+    """
+    The files collect_corpus counted under a corpus dir, with the mtime,
+    size and word counts of each, so later runs only count the files that
+    changed
+    """
+
+    def __init__(self, root):
+        self.root = root
+        # path -> (mtime_ns, size, word counts)
+        self.files = dict()
+        # word counts summed over all the files
+        self.totals = Counter()
+        # the pruning options the vocab was last written with
+        self.prune_options = None
+
+    def dumps(self):
+        return json.dumps(
+            {
+                "root": self.root,
+                "files": {
+                    path: {"mtime_ns": mtime_ns, "size": size, "counts": counts}
+                    for path, (mtime_ns, size, counts) in self.files.items()
+                },
+                "totals": self.totals,
+                "prune_options": self.prune_options,
+            }
+        )
+
+    def loads(dumped_str):
+        dumped = json.loads(dumped_str)
+        manifest = Manifest(dumped["root"])
+        for path, entry in dumped["files"].items():
+            manifest.files[path] = (entry["mtime_ns"], entry["size"], entry["counts"])
+        manifest.totals = Counter(dumped["totals"])
+        manifest.prune_options = dumped.get("prune_options")
+        return manifest
+
+    def load(path, root):
+        """
+        Load the manifest at path, or start an empty one if it is missing or
+        was for a different corpus dir
+        """
+        try:
+            with open(path, "r") as manifest_file:
+                manifest = Manifest.loads(manifest_file.read())
+            if manifest.root == root:
+                return manifest
+        except (OSError, ValueError, KeyError):
+            pass
+        return Manifest(root)
+
+    def update(self, md_paths, jobs=1):
+        """
+        Bring the counts up to date with the files in md_paths, counting
+        only new and changed files. Returns the changed and removed paths.
+        """
+        stats = {md_path: os.stat(md_path) for md_path in md_paths}
+        removed = [path for path in self.files if path not in stats]
+        changed = [
+            path
+            for path, stat in stats.items()
+            if self.files.get(path, (None, None))[:2]
+            != (stat.st_mtime_ns, stat.st_size)
+        ]
+
+        for path in removed + changed:
+            if path in self.files:
+                self.totals.subtract(self.files.pop(path)[2])
+        for path, counts in zip(changed, collect_counts(changed, jobs)):
+            self.files[path] = (stats[path].st_mtime_ns, stats[path].st_size, counts)
+            self.totals.update(counts)
+        for word in [word for word, count in self.totals.items() if count <= 0]:
+            del self.totals[word]
+
+        return changed, removed
+
+
 def main(argv):
-    if len(argv) != 2:
-        print("usage: %s <corpus dir>" % argv[0])
-        return 1
+    parser = argparse.ArgumentParser(prog=argv[0])
+    parser.add_argument("corpusdir", help="directory of markdown files")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of processes to count words in",
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="count every file again rather than only those that changed",
+    )
+    parser.add_argument(
+        "--min-count",
+        type=int,
+        default=1,
+        help="drop words seen fewer than this many times",
+    )
+    parser.add_argument(
+        "--max-size",
+        type=int,
+        default=None,
+        help="keep only this many of the most frequent words",
+    )
+    args = parser.parse_args(argv[1:])
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.max_size is not None and args.max_size < 1:
+        parser.error("--max-size must be at least 1")
 
-    corpusdir = argv[1]
-    vocab_path = "vocab.json"
+    vocab_path = "vocab.bin"
+    manifest_path = "vocab.manifest.json"
+
+    root = os.path.abspath(args.corpusdir)
+    if args.rebuild:
+        manifest = Manifest(root)
+    else:
+        manifest = Manifest.load(manifest_path, root)
+    changed, removed = manifest.update(list(locate("**.md", root)), args.jobs)
+    print("%d files counted, %d removed" % (len(changed), len(removed)))
+    prune_options = {"min_count": args.min_count, "max_size": args.max_size}
+    if (
+        len(changed) == 0
+        and len(removed) == 0
+        and manifest.prune_options == prune_options
+        and os.path.exists(vocab_path)
+    ):
+        print("%s is up to date" % vocab_path)
+        return 0
+    manifest.prune_options = prune_options
 
     vocab = Vocab()
-    for md_path in locate("**.md", corpusdir):
-        with open(md_path, "r") as md_file:
-            print("collecting vocab from", md_path)
-            md_str = md_file.read()
-            vocab.consume_md_str(md_str)
+    vocab.consume_counts(manifest.totals)
+    vocab.prune(args.min_count, args.max_size)
 
     print("writing vocab to %s" % vocab_path)
 
-    with open(vocab_path, "w") as vocab_file:
-        vocab_file.write(vocab.dumps())
+    vocab.write_binary(vocab_path)
+
+    print("writing manifest to %s" % manifest_path)
+
+    with open(manifest_path, "w") as manifest_file:
+        manifest_file.write(manifest.dumps())
 
 
 if __name__ == "__main__":
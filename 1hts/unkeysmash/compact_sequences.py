@@ -0,0 +1,375 @@
+from .edit_sequences import EditSequencesConfig, default_edit_sequence_score
+from .edit_scores import (
+    DEL,
+    INS,
+    MAT,
+    SUB,
+    common_prefix_len,
+    min_edit_score,
+    segment_costs,
+)
+from .substitution_costs import char_index
+
+# get_edit_sequences over a compact representation of edit sequences.
+#
+# Every edit sequence between target[:target_len] and source[:source_len]
+# covers both prefixes in order, so a segment only needs its edit class
+# and where it ends in the target and source; its text is the range from
+# where the previous segment ended. Segments are packed into single ints
+# and sequences are tuples of them, so extending and merging sequences
+# never builds strings, and sequences hash as tuples of small ints.
+
+OFFSET_BITS = 16
+OFFSET_MASK = (1 << OFFSET_BITS) - 1
+
+SEGMENT_CLASSES = ("MAT", "DEL", "INS", "SUB")
+SEGMENT_IDS = {seg_class: seg_id for seg_id, seg_class in enumerate(SEGMENT_CLASSES)}
+
+
+def pack_segment(seg_id, target_end, source_end):
+    return (target_end << OFFSET_BITS | source_end) << 2 | seg_id
+
+
+def segment_id(segment):
+    return segment & 3
+
+
+def segment_ends(segment):
+    return segment >> (OFFSET_BITS + 2), (segment >> 2) & OFFSET_MASK
+
+
+def segment_starts(seq, idx):
+    return segment_ends(seq[idx - 1]) if idx > 0 else (0, 0)
+
+
+def from_edit_sequence(edit_sequence):
+    """
+    Pack an edit sequence of ("MAT", "ab")-style tuples
+    """
+    target_end, source_end = 0, 0
+    packed = []
+    for edit_segment in edit_sequence:
+        seg_id = SEGMENT_IDS[edit_segment[0]]
+        if seg_id == SUB:
+            target_end += len(edit_segment[1])
+            source_end += len(edit_segment[2])
+        else:
+            if seg_id != INS:
+                target_end += len(edit_segment[1])
+            if seg_id != DEL:
+                source_end += len(edit_segment[1])
+        packed.append(pack_segment(seg_id, target_end, source_end))
+    return tuple(packed)
+
+
+def to_edit_sequence(seq, target, source):
+    """
+    Unpack a compact edit sequence between target and source into
+    ("MAT", "ab")-style tuples
+    """
+    edit_sequence = []
+    for idx, segment in enumerate(seq):
+        target_start, source_start = segment_starts(seq, idx)
+        target_end, source_end = segment_ends(segment)
+        seg_id = segment_id(segment)
+        if seg_id == SUB:
+            edit_sequence.append(
+                (
+                    "SUB",
+                    target[target_start:target_end],
+                    source[source_start:source_end],
+                )
+            )
+        elif seg_id == INS:
+            edit_sequence.append(("INS", source[source_start:source_end]))
+        else:
+            edit_sequence.append(
+                (SEGMENT_CLASSES[seg_id], target[target_start:target_end])
+            )
+    return tuple(edit_sequence)
+
+
+class CompactWalkState:
+    """
+    Memoized walk results between a source and a target that can be
+    swapped out for another target.
+
+    The results for (target_len, source_len) only depend on
+    target[:target_len], so memo_rows and score_rows are kept per target
+    length, and switching targets only drops the rows past the prefix the
+    two targets share.
+    """
+
+    __slots__ = ("target", "source", "common_len", "memo_rows", "score_rows")
+
+    def __init__(self, target, source):
+        self.target = ""
+        self.source = source
+        self.common_len = 0
+        # memo_rows[target_len][source_len] is the set of walk results,
+        # and score_rows[target_len] the scores of sequences ending there
+        self.memo_rows = [dict()]
+        self.score_rows = [dict()]
+        self.set_target(target)
+
+    def set_target(self, target):
+        shared_len = common_prefix_len(self.target, target)
+        del self.memo_rows[shared_len + 1 :]
+        del self.score_rows[shared_len + 1 :]
+        while len(self.memo_rows) <= len(target):
+            self.memo_rows.append(dict())
+            self.score_rows.append(dict())
+        self.target = target
+        self.common_len = common_prefix_len(target, self.source)
+
+
+def _ranges_equal(target, target_start, target_end, source, source_start, source_end):
+    return (
+        target_end - target_start == source_end - source_start
+        and target[target_start:target_end] == source[source_start:source_end]
+    )
+
+
+def add_to_compact_sequence(seq, segment, target, source):
+    """
+    Extend seq with the segment for a single character edit, the way
+    add_to_edit_set and then concat_consec do.
+
+    seq is assumed to be valid with no neighbouring segments of the same
+    class, as everything the walk keeps is, so only the last segment of
+    the result can differ from seq.
+    """
+    last_id = seq[-1] & 3
+    new_id = segment & 3
+    if (last_id == DEL and new_id == INS) or (last_id == INS and new_id == DEL):
+        # the DEL and INS become a single SUB, or a MAT if they cancel out
+        target_start, source_start = segment_starts(seq, len(seq) - 1)
+        target_end, source_end = segment_ends(segment)
+        seq = seq[:-1]
+        if _ranges_equal(
+            target, target_start, target_end, source, source_start, source_end
+        ):
+            new_id = MAT
+        else:
+            new_id = SUB
+        segment = pack_segment(new_id, target_end, source_end)
+        if len(seq) == 0:
+            return (segment,)
+        last_id = seq[-1] & 3
+
+    if last_id == new_id:
+        # merge into the last segment. Since the last segment is a valid SUB
+        # if it is one, merging SUBs can't produce a match.
+        return seq[:-1] + (segment,)
+    return seq + (segment,)
+
+
+def _is_valid_segment(seq, idx, target, source):
+    segment = seq[idx]
+    if segment_id(segment) != SUB:
+        return True
+    target_start, source_start = segment_starts(seq, idx)
+    target_end, source_end = segment_ends(segment)
+    if target_end - target_start != source_end - source_start:
+        return False
+    target_seq = target[target_start:target_end]
+    source_seq = source[source_start:source_end]
+    if source_seq in target_seq or target_seq in source_seq:
+        return False
+    return len(set(source_seq).intersection(target_seq)) == 0
+
+
+def _is_valid_pair(seq, idx, target, source):
+    prev_id = segment_id(seq[idx - 1])
+    curr_id = segment_id(seq[idx])
+    if prev_id == DEL and curr_id == INS:
+        return False
+    elif prev_id == INS and curr_id == DEL:
+        return False
+    elif curr_id == SUB:
+        prev_target_start, prev_source_start = segment_starts(seq, idx - 1)
+        target_start, source_start = segment_starts(seq, idx)
+        # subbing in the deleted text
+        if prev_id == DEL and source[source_start] == target[prev_target_start]:
+            return False
+        # subbing out the inserted text
+        elif prev_id == INS and target[target_start] == source[prev_source_start]:
+            return False
+    elif prev_id == SUB:
+        target_end, source_end = segment_ends(seq[idx])
+        prev_target_end, prev_source_end = segment_ends(seq[idx - 1])
+        # subbing in the deleted text
+        if curr_id == INS and target[prev_target_end - 1] == source[source_end - 1]:
+            return False
+        # subbing out the inserted text
+        elif curr_id == DEL and source[prev_source_end - 1] == target[target_end - 1]:
+            return False
+    return True
+
+
+def is_valid_compact_seq(seq, target, source, unchanged_len=0):
+    """
+    is_valid_seq for a compact edit sequence, assuming its first
+    unchanged_len segments are already known to be valid together
+    """
+    for idx in range(unchanged_len, len(seq)):
+        if not _is_valid_segment(seq, idx, target, source):
+            return False
+    for idx in range(max(1, unchanged_len), len(seq)):
+        if not _is_valid_pair(seq, idx, target, source):
+            return False
+    return True
+
+
+def compact_sequence_score(seq, target, source, config=EditSequencesConfig()):
+    """
+    Get config.scoring_algorithm's score for a compact edit sequence.
+
+    The default scoring, with or without substitution costs, is computed
+    straight from the segment lengths. Other scoring algorithms are
+    handed the unpacked sequence.
+    """
+    sub_costs = config.substitution_costs
+    if sub_costs is None:
+        if config.scoring_algorithm != default_edit_sequence_score:
+            return config.scoring_algorithm(to_edit_sequence(seq, target, source))
+    elif config.scoring_algorithm != sub_costs.edit_sequence_score:
+        return config.scoring_algorithm(to_edit_sequence(seq, target, source))
+
+    costs = segment_costs(config.scoring_algorithm)
+    score = 0
+    target_start, source_start = 0, 0
+    for segment in seq:
+        seg_id = segment_id(segment)
+        target_end, source_end = segment_ends(segment)
+        if seg_id == SUB and sub_costs is not None:
+            for offset in range(target_end - target_start):
+                score += sub_costs.rows[char_index(target[target_start + offset])][
+                    char_index(source[source_start + offset])
+                ]
+        else:
+            seg_len = (
+                source_end - source_start
+                if seg_id == INS
+                else target_end - target_start
+            )
+            open_cost, ext_cost = costs[seg_id]
+            score += open_cost + ext_cost * (seg_len - 1)
+        target_start, source_start = target_end, source_end
+    return score
+
+
+def _compact_edit_sequences(walk_state, target_len, source_len, config):
+    memo_row = walk_state.memo_rows[target_len]
+    cached_results = memo_row.get(source_len)
+    if cached_results is not None:
+        return cached_results
+
+    # early exit for long sequences to avoid
+    # exponential set growth
+    if (
+        config.walk_diff_cutoff is not None
+        and abs(target_len - source_len) > config.walk_diff_cutoff
+    ):
+        return frozenset()
+
+    # base cases
+    if target_len == 0 and source_len == 0:
+        return frozenset()
+    if target_len == 0:
+        return frozenset([(pack_segment(INS, 0, source_len),)])
+    elif source_len == 0:
+        return frozenset([(pack_segment(DEL, target_len, 0),)])
+    elif target_len == source_len and target_len <= walk_state.common_len:
+        return frozenset([(pack_segment(MAT, target_len, source_len),)])
+
+    target, source = walk_state.target, walk_state.source
+    diag_id = MAT if target[target_len - 1] == source[source_len - 1] else SUB
+    results = set()
+    for prev_len, seg_id in (
+        ((target_len - 1, source_len), DEL),
+        ((target_len, source_len - 1), INS),
+        ((target_len - 1, source_len - 1), diag_id),
+    ):
+        segment = pack_segment(seg_id, target_len, source_len)
+        for prev_seq in _compact_edit_sequences(walk_state, *prev_len, config):
+            seq = add_to_compact_sequence(prev_seq, segment, target, source)
+            if is_valid_compact_seq(seq, target, source, len(seq) - 1):
+                results.add(seq)
+
+    if config.score_diff_cutoff is not None and len(results) != 0:
+        # filter to best sequences
+        scores = walk_state.score_rows[target_len]
+        for seq in results:
+            if seq not in scores:
+                scores[seq] = compact_sequence_score(seq, target, source, config)
+        min_score = min(scores[seq] for seq in results)
+        results = set(
+            seq for seq in results if scores[seq] < min_score + config.score_diff_cutoff
+        )
+
+    memo_row[source_len] = results
+    return results
+
+
+def get_compact_edit_sequences(target, source, config=EditSequencesConfig()):
+    """
+    get_edit_sequences, as a set of compact edit sequences
+    """
+    return _compact_edit_sequences(
+        CompactWalkState(target, source), len(target), len(source), config
+    )
+
+
+def _walk_min_score(walk_state, config):
+    target, source = walk_state.target, walk_state.source
+    seqs = _compact_edit_sequences(walk_state, len(target), len(source), config)
+    if len(seqs) == 0:
+        return None
+    scores = walk_state.score_rows[len(target)]
+    return min(
+        (
+            scores[seq]
+            if seq in scores
+            else compact_sequence_score(seq, target, source, config)
+        )
+        for seq in seqs
+    )
+
+
+def min_compact_edit_sequence_score(target, source, config=EditSequencesConfig()):
+    """
+    min_edit_sequence_score, computed over compact edit sequences
+    """
+    return _walk_min_score(CompactWalkState(target, source), config)
+
+
+class PrefixSharingScorer:
+    """
+    Edit score engine for Suggester giving the same scores as
+    min_edit_sequence_score, which scores whole candidate sets through
+    score_many with a single walk state.
+
+    Candidates are walked in sorted order, which visits them as a depth
+    first walk of the trie of candidates would, so the memoized results
+    for each shared prefix are computed once per fragment rather than once
+    per word.
+    """
+
+    def min_score(self, source_len, config=EditSequencesConfig()):
+        return min_edit_score(source_len, config)
+
+    def score_many(self, targets, source, config=EditSequencesConfig()):
+        """
+        Get min_edit_sequence_score(target, source, config) for each of
+        targets
+        """
+        walk_state = CompactWalkState("", source)
+        scores = [None] * len(targets)
+        for idx in sorted(range(len(targets)), key=targets.__getitem__):
+            walk_state.set_target(targets[idx])
+            scores[idx] = _walk_min_score(walk_state, config)
+        return scores
+
+    def __call__(self, target, source, config=EditSequencesConfig()):
+        return min_compact_edit_sequence_score(target, source, config)
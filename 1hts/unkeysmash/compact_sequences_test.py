@@ -0,0 +1,127 @@
+import random
+import unittest
+from .compact_sequences import (
+    CompactWalkState,
+    PrefixSharingScorer,
+    _walk_min_score,
+    from_edit_sequence,
+    get_compact_edit_sequences,
+    min_compact_edit_sequence_score,
+    to_edit_sequence,
+)
+from .edit_sequences import (
+    EditSequencesConfig,
+    get_edit_sequences,
+    min_edit_sequence_score,
+)
+from .substitution_costs import SubstitutionCosts
+from .substitution_costs_test import HALF_QUERTY
+from .suggester import Suggester
+from .vocab_index_test import make_vocab, random_words
+
+
+def random_pairs(rng, count, alphabet, max_len):
+    for _ in range(count):
+        yield (
+            "".join(rng.choice(alphabet) for _ in range(rng.randint(0, max_len))),
+            "".join(rng.choice(alphabet) for _ in range(rng.randint(0, max_len))),
+        )
+
+
+class CompactSequencesTest(unittest.TestCase):
+    def test_round_trip(self):
+        for target, source in [("helo", "helw"), ("qw'reall", "we're all")]:
+            for edit_sequence in get_edit_sequences(target, source):
+                seq = from_edit_sequence(edit_sequence)
+                self.assertEqual(to_edit_sequence(seq, target, source), edit_sequence)
+
+    def test_matches_edit_sequences(self):
+        rng = random.Random(1)
+        for config in [
+            EditSequencesConfig(),
+            EditSequencesConfig(score_diff_cutoff=None),
+            EditSequencesConfig(walk_diff_cutoff=2),
+        ]:
+            for target, source in list(random_pairs(rng, 150, "abc", 6)) + [
+                ("abcd", "~b_d"),
+                ("qw'reall", "we're all"),
+            ]:
+                self.assertEqual(
+                    set(
+                        to_edit_sequence(seq, target, source)
+                        for seq in get_compact_edit_sequences(target, source, config)
+                    ),
+                    get_edit_sequences(target, source, config),
+                    (target, source),
+                )
+
+    def test_min_score(self):
+        rng = random.Random(2)
+        for config in [
+            EditSequencesConfig(),
+            EditSequencesConfig(
+                substitution_costs=SubstitutionCosts.build(HALF_QUERTY)
+            ),
+            EditSequencesConfig(scoring_algorithm=lambda seq: len(seq)),
+        ]:
+            for target, source in random_pairs(rng, 150, "fjgp", 6):
+                self.assertEqual(
+                    min_compact_edit_sequence_score(target, source, config),
+                    min_edit_sequence_score(target, source, config),
+                    (target, source),
+                )
+
+    def test_set_target_keeps_shared_rows(self):
+        walk_state = CompactWalkState("inter", "intre")
+        _walk_min_score(walk_state, EditSequencesConfig())
+        shared_row = walk_state.memo_rows[3]
+        self.assertNotEqual(len(shared_row), 0)
+        walk_state.set_target("intro")
+        self.assertIs(walk_state.memo_rows[3], shared_row)
+        self.assertEqual(len(walk_state.memo_rows[4]), 0)
+        self.assertEqual(
+            _walk_min_score(walk_state, EditSequencesConfig()),
+            min_edit_sequence_score("intro", "intre"),
+        )
+
+    def test_prefix_sharing_score_many(self):
+        rng = random.Random(3)
+        scorer = PrefixSharingScorer()
+        for config in [
+            EditSequencesConfig(),
+            EditSequencesConfig(walk_diff_cutoff=2),
+            EditSequencesConfig(
+                substitution_costs=SubstitutionCosts.build(HALF_QUERTY)
+            ),
+        ]:
+            for _ in range(20):
+                source = "".join(rng.choice("fjg") for _ in range(rng.randint(0, 5)))
+                # shared prefixes, duplicates and prefixes of each other
+                targets = [
+                    "".join(rng.choice("fjg") for _ in range(rng.randint(0, 6)))
+                    for _ in range(30)
+                ]
+                targets += [t[: rng.randint(0, len(t))] for t in targets]
+                self.assertEqual(
+                    scorer.score_many(targets, source, config),
+                    [min_edit_sequence_score(t, source, config) for t in targets],
+                    source,
+                )
+
+    def test_suggester_backend(self):
+        rng = random.Random(4)
+        vocab = make_vocab(random_words(rng, 300, alphabet="abcdAB"))
+        config = EditSequencesConfig()
+        prefix_sharing = Suggester(
+            vocab, config, edit_score_engine=PrefixSharingScorer()
+        )
+        walking = Suggester(vocab, config)
+        for fragment in ["a", "ab", "Abc", "dab"]:
+            self.assertEqual(
+                prefix_sharing.get_prefix_suggestions(fragment),
+                walking.get_prefix_suggestions(fragment),
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+
+import sys
+from vocab import Vocab
+
+
+def main(argv):
+    if len(argv) != 3:
+        print("usage: %s <vocab.json> <vocab.bin>" % argv[0])
+        return 1
+
+    json_path, binary_path = argv[1], argv[2]
+    with open(json_path, "r") as json_file:
+        vocab = Vocab.loads(json_file.read())
+
+    print("writing vocab to %s" % binary_path)
+    vocab.write_binary(binary_path)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
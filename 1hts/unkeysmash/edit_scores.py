@@ -0,0 +1,368 @@
+from .edit_sequences import EditSequencesConfig
+from .substitution_costs import char_index
+
+# Score-only counterpart to get_edit_sequences.
+#
+# Rather than building every edit sequence and scoring it afterwards,
+# this walks the same (target_len, source_len) lattice keeping only the
+# cheapest score per cell for each class of trailing edit segment. The
+# trailing class is needed because scoring is per merged segment:
+# extending a MAT run costs differently from opening a new one.
+
+INF = float("inf")
+
+MAT = 0
+DEL = 1
+INS = 2
+SUB = 3
+
+_segment_costs_cache = dict()
+
+
+def segment_costs(scoring_algorithm):
+    """
+    Derive (open, extend) costs for each segment class by probing the
+    scoring algorithm with single-segment sequences.
+
+    This assumes the scoring algorithm sums per-segment scores that
+    grow linearly with segment length, as default_edit_sequence_score does.
+    With substitution costs, the probed SUB costs only matter for their
+    difference, since the per-character cost comes from the matrix.
+    """
+    if scoring_algorithm in _segment_costs_cache:
+        return _segment_costs_cache[scoring_algorithm]
+
+    costs = [None] * 4
+    for seg_id, short_seg, long_seg in [
+        (MAT, ("MAT", "a"), ("MAT", "aa")),
+        (DEL, ("DEL", "a"), ("DEL", "aa")),
+        (INS, ("INS", "a"), ("INS", "aa")),
+        (SUB, ("SUB", "a", "b"), ("SUB", "aa", "bb")),
+    ]:
+        open_cost = scoring_algorithm((short_seg,))
+        costs[seg_id] = (open_cost, scoring_algorithm((long_seg,)) - open_cost)
+
+    costs = tuple(costs)
+    _segment_costs_cache[scoring_algorithm] = costs
+    return costs
+
+
+def min_edit_score(source_len, config=EditSequencesConfig()):
+    """
+    Get a lower bound on the score of any edit sequence between a source of
+    source_len characters and a target of at most source_len characters.
+
+    Only MAT runs can be negative, and each one needs a character from
+    both the target and source plus a separating segment from the next
+    one, so at most (2 * source_len + 1) // 3 of them fit.
+    """
+    (
+        (mat_open, mat_ext),
+        (del_open, del_ext),
+        (ins_open, ins_ext),
+        (sub_open, sub_ext),
+    ) = segment_costs(config.scoring_algorithm)
+    if config.substitution_costs is not None:
+        sub_open, sub_ext = (
+            sub_open - sub_ext + config.substitution_costs.min_cost,
+            config.substitution_costs.min_cost,
+        )
+    min_sep = min(del_open, ins_open, sub_open)
+    if min(min_sep, del_ext, ins_ext, sub_ext, mat_ext) < 0:
+        return -INF
+    if source_len == 0 or mat_open >= 0:
+        return 0
+
+    max_runs = (2 * source_len + 1) // 3
+    return min(0, mat_open, max_runs * mat_open + (max_runs - 1) * min_sep)
+
+
+def substitution_lookup(target, source, config, sub_ext):
+    """
+    Get a matrix and the indices of the target and source characters into
+    it, such that matrix[target_idxs[i]][source_idxs[j]] is the cost of
+    each character of a SUB of source[j] for target[i].
+    """
+    sub_costs = config.substitution_costs
+    if sub_costs is None:
+        return [[sub_ext]], [0] * len(target), [0] * len(source)
+    return (
+        sub_costs.rows,
+        [char_index(c) for c in target],
+        [char_index(c) for c in source],
+    )
+
+
+def get_edit_score(target, source, config=EditSequencesConfig()):
+    """
+    Get the minimum score over the edit sequences between target and
+    source, or None if there are none.
+
+    walk_diff_cutoff bounds the walk the same way it does for
+    get_edit_sequences, as a band around the diagonal, so this takes
+    O(len(target) * walk_diff_cutoff) time and O(walk_diff_cutoff) memory.
+    score_diff_cutoff only trims which near-optimal sequences
+    get_edit_sequences keeps around, so it does not apply here.
+    Because that trimming happens per cell, get_edit_sequences can
+    occasionally drop the true optimum, in which case this returns a
+    lower score than the minimum over its results.
+    """
+    target_len, source_len = len(target), len(source)
+    if target_len == 0 and source_len == 0:
+        return None
+
+    walk_cutoff = config.walk_diff_cutoff
+    if walk_cutoff is None:
+        walk_cutoff = max(target_len, source_len)
+    if abs(target_len - source_len) > walk_cutoff:
+        return None
+
+    (
+        (mat_open, mat_ext),
+        (del_open, del_ext),
+        (ins_open, ins_ext),
+        (sub_open, sub_ext),
+    ) = segment_costs(config.scoring_algorithm)
+    sub_matrix, target_idxs, source_idxs = substitution_lookup(
+        target, source, config, sub_ext
+    )
+    sub_open_extra = sub_open - sub_ext
+
+    common_len = 0
+    while (
+        common_len < min(target_len, source_len)
+        and target[common_len] == source[common_len]
+    ):
+        common_len += 1
+
+    # Only the diagonals within walk_cutoff of the main one are stored:
+    # cell (i, j) lives at index j - i + offset of row i, so the cell
+    # above is at index + 1 of the previous row, the diagonal at index,
+    # and the cell to the left at index - 1. Each row has an INF cell past
+    # either edge of the band for the cells just outside it.
+    walk_cutoff = min(walk_cutoff, max(target_len, source_len))
+    width = 2 * walk_cutoff + 3
+    offset = walk_cutoff + 1
+
+    # row 0: inserting a prefix of source
+    prev_mat = [INF] * width
+    prev_del = [INF] * width
+    prev_ins = [INF] * width
+    prev_sub = [INF] * width
+    for j in range(1, min(source_len, walk_cutoff) + 1):
+        prev_ins[j + offset] = ins_open + ins_ext * (j - 1)
+
+    for i in range(1, target_len + 1):
+        cur_mat = [INF] * width
+        cur_del = [INF] * width
+        cur_ins = [INF] * width
+        cur_sub = [INF] * width
+        shift = offset - i
+        if i <= walk_cutoff:
+            cur_del[shift] = del_open + del_ext * (i - 1)
+
+        target_char = target[i - 1]
+        sub_row = sub_matrix[target_idxs[i - 1]]
+        for j in range(max(1, i - walk_cutoff), min(source_len, i + walk_cutoff) + 1):
+            k = j + shift
+            if i == j and i <= common_len:
+                # matching prefixes only ever produce a single MAT
+                cur_mat[k] = mat_open
+                continue
+
+            up_mat, up_sub = prev_mat[k + 1], prev_sub[k + 1]
+            cur_del[k] = min(
+                prev_del[k + 1] + del_ext,
+                (up_mat if up_mat < up_sub else up_sub) + del_open,
+            )
+            left_mat, left_sub = cur_mat[k - 1], cur_sub[k - 1]
+            cur_ins[k] = min(
+                cur_ins[k - 1] + ins_ext,
+                (left_mat if left_mat < left_sub else left_sub) + ins_open,
+            )
+
+            diag_mat = prev_mat[k]
+            diag_del = prev_del[k]
+            diag_ins = prev_ins[k]
+            diag_sub = prev_sub[k]
+            if i == 1 and j == 1:
+                # a lone SUB, formed from a DEL and INS off of the empty cell,
+                # as long as the band reaches them
+                if walk_cutoff >= 1:
+                    cur_sub[k] = sub_open_extra + sub_row[source_idxs[0]]
+            elif target_char == source[j - 1]:
+                cur_mat[k] = min(
+                    diag_mat + mat_ext,
+                    min(diag_del, diag_ins, diag_sub) + mat_open,
+                )
+            else:
+                sub_cost = sub_row[source_idxs[j - 1]]
+                cur_sub[k] = min(
+                    diag_sub + sub_cost,
+                    min(diag_del, diag_ins, diag_mat) + sub_open_extra + sub_cost,
+                )
+
+        prev_mat, prev_del, prev_ins, prev_sub = cur_mat, cur_del, cur_ins, cur_sub
+
+    k = source_len + offset - target_len
+    score = min(prev_mat[k], prev_del[k], prev_ins[k], prev_sub[k])
+    return None if score == INF else score
+
+
+EMPTY_CELL = (INF, INF, INF, INF)
+
+
+def common_prefix_len(a, b):
+    i = 0
+    while i < min(len(a), len(b)) and a[i] == b[i]:
+        i += 1
+    return i
+
+
+class EditScoreTable:
+    """
+    The get_edit_score lattice between a target and source that can both
+    be appended to, so a table for a short prefix can be grown into the
+    table for a longer one by computing only the new row and column.
+
+    Cells are (MAT, DEL, INS, SUB) tuples of the cheapest score ending in
+    each segment class. Only the cells within walk_diff_cutoff of the
+    diagonal are stored, so row i holds the cells from column
+    _row_start(i) on.
+    """
+
+    def __init__(self, config=EditSequencesConfig()):
+        self.costs = segment_costs(config.scoring_algorithm)
+        self.substitution_costs = config.substitution_costs
+        self.walk_cutoff = config.walk_diff_cutoff
+        self.target = ""
+        self.source = ""
+        self.common_len = 0
+        self.rows = [[EMPTY_CELL]]
+
+    def _update_common_len(self):
+        target, source = self.target, self.source
+        while (
+            self.common_len < min(len(target), len(source))
+            and target[self.common_len] == source[self.common_len]
+        ):
+            self.common_len += 1
+
+    def _row_start(self, i):
+        if self.walk_cutoff is None:
+            return 0
+        return max(0, i - self.walk_cutoff)
+
+    def _in_band(self, i, j):
+        return self.walk_cutoff is None or abs(i - j) <= self.walk_cutoff
+
+    def _get(self, i, j):
+        row = self.rows[i]
+        idx = j - self._row_start(i)
+        if idx < 0 or idx >= len(row):
+            return EMPTY_CELL
+        return row[idx]
+
+    def _cell(self, i, j):
+        if not self._in_band(i, j):
+            return EMPTY_CELL
+        if i == 0 and j == 0:
+            return EMPTY_CELL
+
+        (
+            (mat_open, mat_ext),
+            (del_open, del_ext),
+            (ins_open, ins_ext),
+            (sub_open, sub_ext),
+        ) = self.costs
+
+        if i == j and i <= self.common_len:
+            return (mat_open, INF, INF, INF)
+        if i == 0:
+            return (INF, INF, ins_open + ins_ext * (j - 1), INF)
+        if j == 0:
+            return (INF, del_open + del_ext * (i - 1), INF, INF)
+
+        up_mat, up_del, _, up_sub = self._get(i - 1, j)
+        left_mat, _, left_ins, left_sub = self._get(i, j - 1)
+        diag_mat, diag_del, diag_ins, diag_sub = self._get(i - 1, j - 1)
+
+        target_char, source_char = self.target[i - 1], self.source[j - 1]
+        if self.substitution_costs is not None:
+            sub_cost = self.substitution_costs.cost(target_char, source_char)
+            sub_open, sub_ext = sub_open - sub_ext + sub_cost, sub_cost
+
+        cell_mat, cell_sub = INF, INF
+        if i == 1 and j == 1:
+            if self._in_band(0, 1):
+                cell_sub = sub_open
+        elif target_char == source_char:
+            cell_mat = min(
+                diag_mat + mat_ext, min(diag_del, diag_ins, diag_sub) + mat_open
+            )
+        else:
+            cell_sub = min(
+                diag_sub + sub_ext, min(diag_del, diag_ins, diag_mat) + sub_open
+            )
+
+        return (
+            cell_mat,
+            min(up_del + del_ext, min(up_mat, up_sub) + del_open),
+            min(left_ins + ins_ext, min(left_mat, left_sub) + ins_open),
+            cell_sub,
+        )
+
+    def extend(self, target_chars, source_chars):
+        """
+        Append to the target and source, filling in the new columns and rows
+        """
+        for c in source_chars:
+            self.source += c
+            self._update_common_len()
+            j = len(self.source)
+            for i, row in enumerate(self.rows):
+                if self._in_band(i, j):
+                    row.append(self._cell(i, j))
+        for c in target_chars:
+            self.target += c
+            self._update_common_len()
+            i = len(self.target)
+            row = []
+            self.rows.append(row)
+            source_end = len(self.source)
+            if self.walk_cutoff is not None:
+                source_end = min(source_end, i + self.walk_cutoff)
+            for j in range(self._row_start(i), source_end + 1):
+                row.append(self._cell(i, j))
+
+    def truncate(self, target_len, source_len):
+        """
+        Drop the end of the target and source, back to the given lengths
+        """
+        self.target = self.target[:target_len]
+        self.source = self.source[:source_len]
+        self.common_len = min(self.common_len, target_len, source_len)
+        del self.rows[target_len + 1 :]
+        for i, row in enumerate(self.rows):
+            del row[max(0, source_len + 1 - self._row_start(i)) :]
+
+    def sync(self, target, source):
+        """
+        Bring the table to the given target and source, keeping every row
+        and column for the prefixes they share with the current ones
+        """
+        target_len = common_prefix_len(self.target, target)
+        source_len = common_prefix_len(self.source, source)
+        if target_len != len(self.target) or source_len != len(self.source):
+            self.truncate(target_len, source_len)
+        self.extend(target[target_len:], source[source_len:])
+
+    def score(self):
+        """
+        Get the same score get_edit_score would for the current target and
+        source
+        """
+        if len(self.target) == 0 and len(self.source) == 0:
+            return None
+        score = min(self._get(len(self.target), len(self.source)))
+        return None if score == INF else score
@@ -0,0 +1,131 @@
+import random
+import unittest
+from .edit_sequences import (
+    EditSequencesConfig,
+    default_edit_sequence_score,
+    get_edit_sequences,
+    min_edit_sequence_score,
+)
+from .edit_scores import EditScoreTable, get_edit_score
+
+
+class EditScoresTest(unittest.TestCase):
+    def test_get_edit_score_empty(self):
+        self.assertEqual(get_edit_score("", ""), None)
+
+    def test_get_edit_score_base_cases(self):
+        self.assertEqual(
+            get_edit_score("abcd", "abcd"),
+            default_edit_sequence_score((("MAT", "abcd"),)),
+        )
+        self.assertEqual(
+            get_edit_score("abcd", ""),
+            default_edit_sequence_score((("DEL", "abcd"),)),
+        )
+        self.assertEqual(
+            get_edit_score("", "abcd"),
+            default_edit_sequence_score((("INS", "abcd"),)),
+        )
+
+    def test_get_edit_score_walk_cutoff(self):
+        self.assertEqual(
+            get_edit_score("a", "abcdefgh", EditSequencesConfig(walk_diff_cutoff=3)),
+            None,
+        )
+
+    def test_get_edit_score_matches_sequences(self):
+        for target, source in [
+            ("ae", "ac"),
+            ("helo", "helw"),
+            ("abcd", "ab_d"),
+            ("abcd", "~bcd"),
+            ("abcd", "~b_d"),
+            ("qw'reall", "we're all"),
+        ]:
+            self.assertEqual(
+                get_edit_score(target, source),
+                min_edit_sequence_score(target, source),
+            )
+
+    def test_get_edit_score_randomized_unfiltered(self):
+        # without per-cell score filtering, the enumerated minimum is exact
+        config = EditSequencesConfig(score_diff_cutoff=None)
+        rng = random.Random(1)
+        for _ in range(300):
+            target = "".join(rng.choice("abc") for _ in range(rng.randint(0, 5)))
+            source = "".join(rng.choice("abc") for _ in range(rng.randint(0, 5)))
+            self.assertEqual(
+                get_edit_score(target, source, config),
+                min_edit_sequence_score(target, source, config),
+                (target, source),
+            )
+
+    def test_get_edit_score_randomized_band(self):
+        rng = random.Random(4)
+        for walk_cutoff in range(1, 4):
+            config = EditSequencesConfig(
+                score_diff_cutoff=None, walk_diff_cutoff=walk_cutoff
+            )
+            table = EditScoreTable(config)
+            for _ in range(100):
+                target = "".join(rng.choice("abc") for _ in range(rng.randint(0, 6)))
+                source = "".join(rng.choice("abc") for _ in range(rng.randint(0, 6)))
+                score = min_edit_sequence_score(target, source, config)
+                self.assertEqual(
+                    get_edit_score(target, source, config), score, (target, source)
+                )
+                table.sync(target, source)
+                self.assertEqual(table.score(), score, (target, source))
+
+    def test_get_edit_score_zero_band(self):
+        # the lone SUB off of the empty cell needs the cells beside the
+        # diagonal, which a zero width band leaves out
+        config = EditSequencesConfig(score_diff_cutoff=None, walk_diff_cutoff=0)
+        self.assertEqual(min_edit_sequence_score("ab", "cb", config), None)
+        self.assertEqual(get_edit_score("ab", "cb", config), None)
+        table = EditScoreTable(config)
+        table.sync("ab", "cb")
+        self.assertEqual(table.score(), None)
+
+    def test_edit_score_table_band_storage(self):
+        table = EditScoreTable(EditSequencesConfig(walk_diff_cutoff=2))
+        table.sync("abcdefghijkl", "abdcefgihjkl")
+        for row in table.rows:
+            self.assertLessEqual(len(row), 2 * 2 + 1)
+        self.assertEqual(table.score(), get_edit_score("abcdefghijkl", "abdcefgihjkl"))
+
+    def test_get_edit_score_randomized_lower_bound(self):
+        rng = random.Random(2)
+        for _ in range(300):
+            target = "".join(rng.choice("abcde") for _ in range(rng.randint(1, 7)))
+            source = "".join(rng.choice("abcde") for _ in range(rng.randint(1, 7)))
+            sequences = get_edit_sequences(target, source)
+            if len(sequences) == 0:
+                continue
+            self.assertLessEqual(
+                get_edit_score(target, source),
+                min(default_edit_sequence_score(seq) for seq in sequences),
+                (target, source),
+            )
+
+    def test_edit_score_table_sync(self):
+        rng = random.Random(3)
+        for config in [EditSequencesConfig(), EditSequencesConfig(walk_diff_cutoff=2)]:
+            table = EditScoreTable(config)
+            for _ in range(300):
+                target = "".join(rng.choice("abc") for _ in range(rng.randint(0, 8)))
+                source = "".join(rng.choice("abc") for _ in range(rng.randint(0, 8)))
+                # bias towards extending the previous strings
+                if rng.random() < 0.7:
+                    target = table.target[: rng.randint(0, 8)] + target[:2]
+                    source = table.source[: rng.randint(0, 8)] + source[:2]
+                table.sync(target, source)
+                self.assertEqual(
+                    table.score(),
+                    get_edit_score(target, source, config),
+                    (target, source),
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
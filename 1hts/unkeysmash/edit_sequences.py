@@ -2,8 +2,6 @@
 # spoonerism sequences (DEL x) (MAT y) (INS x) as cheaper
 # than a DEL + an INS
 #
-# scoring SUB based on distance between keys and layer aliasing
-#
 # scoring INS based on distance between adjacent keys + layer
 # aliasing
 def default_score_segment(edit_segment):
@@ -30,14 +28,26 @@ class EditSequencesConfig:
         self,
         score_diff_cutoff=3,
         walk_diff_cutoff=5,
-        scoring_algorithm=default_edit_sequence_score,
+        scoring_algorithm=None,
+        substitution_costs=None,
     ):
+        # substitution_costs is a SubstitutionCosts matrix of per-character
+        # SUB costs, which SUB segments are scored by unless a
+        # scoring_algorithm is given as well
+        if scoring_algorithm is None:
+            if substitution_costs is None:
+                scoring_algorithm = default_edit_sequence_score
+            else:
+                scoring_algorithm = substitution_costs.edit_sequence_score
         self.score_diff_cutoff = score_diff_cutoff
         self.walk_diff_cutoff = walk_diff_cutoff
         self.scoring_algorithm = scoring_algorithm
+        self.substitution_costs = substitution_costs
 
 
 class EditSequenceWalkState:
+    __slots__ = ("memo_map", "scores")
+
     def __init__(
         self,
     ):
@@ -178,17 +188,9 @@ def is_valid_seq(seq):
     return True
 
 
-def _edit_sequences(walk_state, target, source, target_len, source_len, config):
-    cached_results = walk_state.check_results(target, source, target_len, source_len)
-    if cached_results is not None:
-        return cached_results
-
-    # early exit for long sequences to avoid
-    # exponential set growth
-    if abs(target_len - source_len) > config.walk_diff_cutoff:
-        return set()
-
-    # base cases
+def _base_edit_sequences(target, source, target_len, source_len):
+    # results for the edges of the walk, or None for cells built from
+    # their neighbours
     if target_len == 0 and source_len == 0:
         return set()
     if target_len == 0:
@@ -201,33 +203,36 @@ def _edit_sequences(walk_state, target, source, target_len, source_len, config):
         return set(
             [(edit_match(target[:target_len]),)],
         )
-
+    return None
+
+
+def _walk_cell(
+    walk_state,
+    target,
+    source,
+    target_len,
+    source_len,
+    config,
+    del_results,
+    ins_results,
+    sub_results,
+):
+    # results for a cell, from the results of the cells before it
     results = set(
         filter(
             is_valid_seq,
             map(
                 concat_consec,
                 add_to_edit_set(
-                    _edit_sequences(
-                        walk_state, target, source, target_len - 1, source_len, config
-                    ),
+                    del_results,
                     edit_deletion(target[target_len - 1]),
                 )
                 | add_to_edit_set(
-                    _edit_sequences(
-                        walk_state, target, source, target_len, source_len - 1, config
-                    ),
+                    ins_results,
                     edit_insertion(source[source_len - 1]),
                 )
                 | add_to_edit_set(
-                    _edit_sequences(
-                        walk_state,
-                        target,
-                        source,
-                        target_len - 1,
-                        source_len - 1,
-                        config,
-                    ),
+                    sub_results,
                     edit_subst(
                         target[target_len - 1],
                         source[source_len - 1],
@@ -245,19 +250,102 @@ def _edit_sequences(walk_state, target, source, target_len, source_len, config):
                 walk_state.scores[res_seq] = config.scoring_algorithm(res_seq)
             scores[res_seq] = walk_state.scores[res_seq]
         min_score = min(scores.values())
-        filtered_results = set(
+        return set(
             filter(
                 lambda seq: scores[seq] < min_score + config.score_diff_cutoff, results
             )
         )
-        walk_state.set_results(target, source, target_len, source_len, filtered_results)
-        return filtered_results
     else:
-        walk_state.set_results(target, source, target_len, source_len, results)
         return results
 
 
+def _edit_sequences(walk_state, target, source, target_len, source_len, config):
+    cached_results = walk_state.check_results(target, source, target_len, source_len)
+    if cached_results is not None:
+        return cached_results
+
+    # early exit for long sequences to avoid
+    # exponential set growth
+    if abs(target_len - source_len) > config.walk_diff_cutoff:
+        return set()
+
+    # base cases
+    base_results = _base_edit_sequences(target, source, target_len, source_len)
+    if base_results is not None:
+        return base_results
+
+    results = _walk_cell(
+        walk_state,
+        target,
+        source,
+        target_len,
+        source_len,
+        config,
+        _edit_sequences(walk_state, target, source, target_len - 1, source_len, config),
+        _edit_sequences(walk_state, target, source, target_len, source_len - 1, config),
+        _edit_sequences(
+            walk_state, target, source, target_len - 1, source_len - 1, config
+        ),
+    )
+    walk_state.set_results(target, source, target_len, source_len, results)
+    return results
+
+
 def get_edit_sequences(target, source, config=EditSequencesConfig()):
     return _edit_sequences(
         EditSequenceWalkState(), target, source, len(target), len(source), config
     )
+
+
+def get_edit_sequences_iterative(target, source, config=EditSequencesConfig()):
+    """
+    get_edit_sequences, filling in the walk's cells row by row rather than
+    recursing from the last one, so long inputs can't hit the recursion
+    limit.
+
+    Every cell inside walk_diff_cutoff is computed, where the recursive
+    walk only visits the ones the last cell reaches, but each cell's
+    results only depend on the cells before it, so the results match.
+    """
+    walk_state = EditSequenceWalkState()
+    target_len, source_len = len(target), len(source)
+    walk_cutoff = config.walk_diff_cutoff
+    if walk_cutoff is None:
+        walk_cutoff = max(target_len, source_len)
+
+    empty = set()
+    prev_row = dict()
+    for i in range(target_len + 1):
+        row = dict()
+        for j in range(max(0, i - walk_cutoff), min(source_len, i + walk_cutoff) + 1):
+            results = _base_edit_sequences(target, source, i, j)
+            if results is None:
+                results = _walk_cell(
+                    walk_state,
+                    target,
+                    source,
+                    i,
+                    j,
+                    config,
+                    prev_row.get(j, empty),
+                    row.get(j - 1, empty),
+                    prev_row.get(j - 1, empty),
+                )
+            row[j] = results
+        prev_row = row
+
+    return prev_row.get(source_len, empty)
+
+
+def min_edit_sequence_score(target, source, config=EditSequencesConfig()):
+    """
+    Get the minimum score over get_edit_sequences, or None if there
+    are no edit sequences between target and source.
+    """
+    edit_sequence_candidates = get_edit_sequences(target, source, config)
+    if len(edit_sequence_candidates) == 0:
+        return None
+    return min(
+        config.scoring_algorithm(edit_sequence)
+        for edit_sequence in edit_sequence_candidates
+    )
@@ -1,5 +1,11 @@
+import random
+import sys
 import unittest
-from .edit_sequences import get_edit_sequences
+from .edit_sequences import (
+    EditSequencesConfig,
+    get_edit_sequences,
+    get_edit_sequences_iterative,
+)
 
 
 class EditSequencesTest(unittest.TestCase):
@@ -177,6 +183,37 @@ class EditSequencesTest(unittest.TestCase):
             ),
         )
 
+    def test_get_edit_sequences_iterative(self):
+        rng = random.Random(1)
+        for config in [
+            EditSequencesConfig(),
+            EditSequencesConfig(score_diff_cutoff=None),
+            EditSequencesConfig(walk_diff_cutoff=2),
+        ]:
+            for _ in range(150):
+                target = "".join(rng.choice("abc") for _ in range(rng.randint(0, 6)))
+                source = "".join(rng.choice("abc") for _ in range(rng.randint(0, 6)))
+                self.assertEqual(
+                    get_edit_sequences_iterative(target, source, config),
+                    get_edit_sequences(target, source, config),
+                    (target, source),
+                )
+
+    def test_get_edit_sequences_iterative_long(self):
+        # long enough that the recursive walk hits the recursion limit
+        recursion_limit = sys.getrecursionlimit()
+        target = "ab" * (recursion_limit // 2)
+        source = target[:-1] + "x"
+        with self.assertRaises(RecursionError):
+            get_edit_sequences(target, source)
+
+        result = get_edit_sequences_iterative(target, source)
+        sys.setrecursionlimit(4 * recursion_limit)
+        try:
+            self.assertEqual(result, get_edit_sequences(target, source))
+        finally:
+            sys.setrecursionlimit(recursion_limit)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,89 @@
+# Physical layout of the main block of a US QWERTY keyboard, by linux
+# keycode, for scoring typos by how close together keys are.
+#
+# Positions are (row, column) in key widths, with each row's column
+# offset by its stagger relative to the number row.
+
+_rows = [
+    # (row stagger, [(keycode, unshifted, shifted), ...])
+    (
+        0.0,
+        [
+            (41, "`", "~"),
+            (2, "1", "!"),
+            (3, "2", "@"),
+            (4, "3", "#"),
+            (5, "4", "$"),
+            (6, "5", "%"),
+            (7, "6", "^"),
+            (8, "7", "&"),
+            (9, "8", "*"),
+            (10, "9", "("),
+            (11, "0", ")"),
+            (12, "-", "_"),
+            (13, "=", "+"),
+        ],
+    ),
+    (
+        1.5,
+        [
+            (16, "q", "Q"),
+            (17, "w", "W"),
+            (18, "e", "E"),
+            (19, "r", "R"),
+            (20, "t", "T"),
+            (21, "y", "Y"),
+            (22, "u", "U"),
+            (23, "i", "I"),
+            (24, "o", "O"),
+            (25, "p", "P"),
+            (26, "[", "{"),
+            (27, "]", "}"),
+            (43, "\\", "|"),
+        ],
+    ),
+    (
+        1.75,
+        [
+            (30, "a", "A"),
+            (31, "s", "S"),
+            (32, "d", "D"),
+            (33, "f", "F"),
+            (34, "g", "G"),
+            (35, "h", "H"),
+            (36, "j", "J"),
+            (37, "k", "K"),
+            (38, "l", "L"),
+            (39, ";", ":"),
+            (40, "'", '"'),
+        ],
+    ),
+    (
+        2.25,
+        [
+            (44, "z", "Z"),
+            (45, "x", "X"),
+            (46, "c", "C"),
+            (47, "v", "V"),
+            (48, "b", "B"),
+            (49, "n", "N"),
+            (50, "m", "M"),
+            (51, ",", "<"),
+            (52, ".", ">"),
+            (53, "/", "?"),
+        ],
+    ),
+]
+
+# keycode -> (row, column)
+key_positions = dict()
+# keycode -> (unshifted char, shifted char)
+key_chars = dict()
+
+for row, (stagger, keys) in enumerate(_rows):
+    for col, (keycode, unshifted, shifted) in enumerate(keys):
+        key_positions[keycode] = (row, stagger + col)
+        key_chars[keycode] = (unshifted, shifted)
+
+key_positions[57] = (4, 6.0)
+key_chars[57] = (" ", " ")
@@ -0,0 +1,171 @@
+import heapq
+from itertools import count
+from .edit_sequences import EditSequencesConfig, is_valid_seq
+from .edit_scores import DEL, INF, INS, MAT, SUB, EditScoreTable
+
+# Edit sequences in increasing score order, without building the sets
+# get_edit_sequences does.
+#
+# The get_edit_score lattice has a node per (target_len, source_len,
+# segment class), and each edit sequence is a path through it from the
+# empty cell to the last one. The forward DP gives the cheapest score
+# of reaching every node, so searching backwards from the last cell with
+# those scores as the A* heuristic finds paths in exactly increasing
+# score order, only expanding nodes on or near the paths it returns.
+
+_SEGMENT_CLASSES = ("MAT", "DEL", "INS", "SUB")
+
+
+def _edit_segment(seg_id, target, source, start, end):
+    if seg_id == SUB:
+        return ("SUB", target[start[0] : end[0]], source[start[1] : end[1]])
+    elif seg_id == INS:
+        return ("INS", source[start[1] : end[1]])
+    return (_SEGMENT_CLASSES[seg_id], target[start[0] : end[0]])
+
+
+def _path_edit_sequence(path, target, source):
+    # path is [(class, i, j), ...] from the first node to the last
+    edit_sequence = []
+    start = (0, 0)
+    for idx, (seg_id, i, j) in enumerate(path):
+        if idx + 1 < len(path) and path[idx + 1][0] == seg_id:
+            continue
+        edit_sequence.append(_edit_segment(seg_id, target, source, start, (i, j)))
+        start = (i, j)
+    return tuple(edit_sequence)
+
+
+def iter_ranked_edit_sequences(target, source, config=EditSequencesConfig()):
+    """
+    Yield (score, edit_sequence) for the edit sequences between target and
+    source in increasing score order.
+
+    These are the sequences get_edit_sequences finds without
+    score_diff_cutoff, within walk_diff_cutoff. The first one costs about
+    as much as get_edit_score, and each one after that only a little more.
+    """
+    table = EditScoreTable(config)
+    table.sync(target, source)
+    target_len, source_len = len(target), len(source)
+    if target_len == 0 and source_len == 0:
+        return
+
+    (
+        (mat_open, mat_ext),
+        (del_open, del_ext),
+        (ins_open, ins_ext),
+        (sub_open, sub_ext),
+    ) = table.costs
+    sub_costs = table.substitution_costs
+
+    def starts_path(seg_id, i, j):
+        # nodes only reachable straight from the empty cell
+        return (
+            i == 0
+            or j == 0
+            or (i == j and i <= table.common_len)
+            or (i == 1 and j == 1 and seg_id == SUB)
+        )
+
+    def predecessors(seg_id, i, j):
+        # (class, i, j, step cost) of the nodes the DP builds this one from
+        if seg_id == DEL:
+            i, j = i - 1, j
+            ext_cost, open_cost, open_from = del_ext, del_open, (MAT, SUB)
+        elif seg_id == INS:
+            i, j = i, j - 1
+            ext_cost, open_cost, open_from = ins_ext, ins_open, (MAT, SUB)
+        elif seg_id == MAT:
+            i, j = i - 1, j - 1
+            ext_cost, open_cost, open_from = mat_ext, mat_open, (DEL, INS, SUB)
+        else:
+            ext_cost, open_cost = sub_ext, sub_open
+            if sub_costs is not None:
+                sub_cost = sub_costs.cost(target[i - 1], source[j - 1])
+                ext_cost, open_cost = sub_cost, sub_open - sub_ext + sub_cost
+            i, j = i - 1, j - 1
+            open_from = (DEL, INS, MAT)
+
+        cell = table._get(i, j)
+        yield seg_id, i, j, ext_cost, cell[seg_id]
+        for prev_id in open_from:
+            yield prev_id, i, j, open_cost, cell[prev_id]
+
+    # entries are (lowest total score, tiebreak, score of the steps after
+    # the node, node, steps after the node as a linked list, where the
+    # node's segment ends, the segment after it)
+    tiebreak = count()
+    frontier = []
+    last_cell = table._get(target_len, source_len)
+    for seg_id in (MAT, DEL, INS, SUB):
+        if last_cell[seg_id] != INF:
+            node = (seg_id, target_len, source_len)
+            heapq.heappush(
+                frontier,
+                (
+                    last_cell[seg_id],
+                    next(tiebreak),
+                    0,
+                    node,
+                    None,
+                    (target_len, source_len),
+                    None,
+                ),
+            )
+
+    while len(frontier) != 0:
+        score, _, suffix_score, node, suffix, seg_end, next_segment = heapq.heappop(
+            frontier
+        )
+        if starts_path(*node):
+            path = [node]
+            while suffix is not None:
+                step, suffix = suffix
+                path.append(step)
+            # the walk drops sequences that are invalid at any cell along
+            # the way, not just at the end
+            if all(
+                is_valid_seq(_path_edit_sequence(path[:n], target, source))
+                for n in range(1, len(path) + 1)
+            ):
+                yield score, _path_edit_sequence(path, target, source)
+            continue
+
+        for prev_id, i, j, step_cost, prev_score in predecessors(*node):
+            if prev_score == INF:
+                continue
+            prev_seg_end, prev_next_segment = seg_end, next_segment
+            if prev_id != node[0]:
+                # the node's segment starts here, so drop the path early if
+                # it is already invalid after this point
+                segment = _edit_segment(node[0], target, source, (i, j), seg_end)
+                tail = (segment,) if next_segment is None else (segment, next_segment)
+                if not is_valid_seq(tail):
+                    continue
+                prev_seg_end, prev_next_segment = (i, j), segment
+            prev_suffix_score = suffix_score + step_cost
+            heapq.heappush(
+                frontier,
+                (
+                    prev_score + prev_suffix_score,
+                    next(tiebreak),
+                    prev_suffix_score,
+                    (prev_id, i, j),
+                    (node, suffix),
+                    prev_seg_end,
+                    prev_next_segment,
+                ),
+            )
+
+
+def get_k_best_edit_sequences(target, source, k, config=EditSequencesConfig()):
+    """
+    Get up to k (score, edit_sequence) pairs with the lowest scores
+    """
+    ranked = []
+    for scored in iter_ranked_edit_sequences(target, source, config):
+        ranked.append(scored)
+        if len(ranked) == k:
+            break
+    return ranked
@@ -0,0 +1,52 @@
+import random
+import unittest
+from .compact_sequences_test import random_pairs
+from .edit_sequences import EditSequencesConfig, get_edit_sequences
+from .ranked_sequences import get_k_best_edit_sequences, iter_ranked_edit_sequences
+from .substitution_costs import SubstitutionCosts
+from .substitution_costs_test import HALF_QUERTY
+
+
+class RankedSequencesTest(unittest.TestCase):
+    def test_matches_edit_sequences(self):
+        rng = random.Random(1)
+        for config in [
+            EditSequencesConfig(score_diff_cutoff=None),
+            EditSequencesConfig(score_diff_cutoff=None, walk_diff_cutoff=2),
+            EditSequencesConfig(
+                score_diff_cutoff=None,
+                substitution_costs=SubstitutionCosts.build(HALF_QUERTY),
+            ),
+        ]:
+            for target, source in list(random_pairs(rng, 150, "fjg", 5)) + [
+                ("abcd", "~b_d"),
+                ("helo", "helw"),
+            ]:
+                ranked = list(iter_ranked_edit_sequences(target, source, config))
+                edit_sequences = [edit_sequence for _, edit_sequence in ranked]
+                self.assertEqual(len(edit_sequences), len(set(edit_sequences)))
+                self.assertEqual(
+                    set(edit_sequences),
+                    get_edit_sequences(target, source, config),
+                    (target, source),
+                )
+                scores = [score for score, _ in ranked]
+                self.assertEqual(scores, sorted(scores))
+                for score, edit_sequence in ranked:
+                    self.assertEqual(score, config.scoring_algorithm(edit_sequence))
+
+    def test_k_best(self):
+        config = EditSequencesConfig(score_diff_cutoff=None)
+        all_scores = sorted(
+            config.scoring_algorithm(edit_sequence)
+            for edit_sequence in get_edit_sequences("qw'reall", "we're all", config)
+        )
+        k_best = get_k_best_edit_sequences("qw'reall", "we're all", 3, config)
+        self.assertEqual([score for score, _ in k_best], all_scores[:3])
+        self.assertEqual(
+            get_k_best_edit_sequences("ab", "ab", 3, config), [(-9, (("MAT", "ab"),))]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,174 @@
+import hashlib
+import json
+from .key_positions import key_chars, key_positions
+from .edit_sequences import default_score_segment
+
+# Characters are looked up in the matrix by code point, with everything
+# past ascii sharing a single row and column
+ALPHABET_SIZE = 128
+OTHER_CHAR = ALPHABET_SIZE
+
+
+def char_index(c):
+    code = ord(c)
+    return code if code < ALPHABET_SIZE else OTHER_CHAR
+
+
+def key_distance(keycode_a, keycode_b):
+    row_a, col_a = key_positions[keycode_a]
+    row_b, col_b = key_positions[keycode_b]
+    return ((row_a - row_b) ** 2 + (col_a - col_b) ** 2) ** 0.5
+
+
+def keymap_hash(keymap_bin):
+    return hashlib.sha1(keymap_bin).hexdigest()
+
+
+class SubstitutionCosts:
+    """
+    Per-character SUB costs, as a dense matrix indexed by
+    [char_index(target_char)][char_index(source_char)].
+
+    Pass as EditSequencesConfig(substitution_costs=...) to score SUB
+    segments by the sum of their per-character costs instead of their
+    length. The edit score DPs then look each cell's SUB cost up in the
+    matrix rather than using a flat per-character cost.
+    """
+
+    def __init__(self, rows, params=None, keymap_hash=None):
+        self.rows = rows
+        self.params = params
+        self.keymap_hash = keymap_hash
+        self.min_cost = min(min(row) for row in rows)
+
+    def cost(self, target_char, source_char):
+        return self.rows[char_index(target_char)][char_index(source_char)]
+
+    def score_segment(self, edit_segment):
+        if edit_segment[0] == "SUB":
+            _, target_seq, source_seq = edit_segment
+            return sum(self.cost(t, s) for t, s in zip(target_seq, source_seq))
+        return default_score_segment(edit_segment)
+
+    def edit_sequence_score(self, edit_sequence):
+        return sum(self.score_segment(edit_segment) for edit_segment in edit_sequence)
+
+    @staticmethod
+    def build(
+        alias_map,
+        alias_cost=0.25,
+        neighbour_cost=0.5,
+        default_cost=1,
+        neighbour_distance=1.25,
+    ):
+        """
+        Build the matrix for a keymap, from its lib1hts.aliasmap.AliasMap.
+
+        Characters on the same physical key (shifted or not), or on keys
+        the keymap aliases to each other on another layer, cost alias_cost
+        to substitute. Characters on keys within neighbour_distance key
+        widths of each other cost neighbour_cost, as do characters the
+        keymap aliases onto such keys, so on halfquerty j, typed on the f
+        key, neighbours d. Anything else costs default_cost.
+        """
+        rows = [[default_cost] * (ALPHABET_SIZE + 1) for _ in range(ALPHABET_SIZE + 1)]
+
+        def set_cost(keycode_a, keycode_b, cost):
+            if keycode_a not in key_chars or keycode_b not in key_chars:
+                return
+            for a in key_chars[keycode_a]:
+                for b in key_chars[keycode_b]:
+                    if a == b:
+                        continue
+                    for t, s in ((a, b), (b, a)):
+                        row = rows[char_index(t)]
+                        row[char_index(s)] = min(row[char_index(s)], cost)
+
+        def layer_keys(keycode):
+            # the key itself, and the keys typed on it on another layer
+            return (
+                {keycode}
+                | alias_map.forward_aliases.get(keycode, set())
+                | alias_map.reverse_aliases.get(keycode, set())
+            )
+
+        # neighbours on the board as typed, so a key's neighbours are also
+        # neighbours of everything the keymap puts on it
+        for keycode_a in key_positions:
+            for keycode_b in key_positions:
+                if key_distance(keycode_a, keycode_b) <= neighbour_distance:
+                    for layer_key_a in layer_keys(keycode_a):
+                        for layer_key_b in layer_keys(keycode_b):
+                            set_cost(layer_key_a, layer_key_b, neighbour_cost)
+
+        # keys aliased to each other, and keys aliased onto the same key
+        for source_key, target_keys in alias_map.forward_aliases.items():
+            for target_key in target_keys:
+                set_cost(source_key, target_key, alias_cost)
+        for target_key, source_keys in alias_map.reverse_aliases.items():
+            for source_key_a in source_keys:
+                for source_key_b in source_keys:
+                    set_cost(source_key_a, source_key_b, alias_cost)
+
+        for keycode in key_chars:
+            set_cost(keycode, keycode, alias_cost)
+
+        params = {
+            "alias_cost": alias_cost,
+            "neighbour_cost": neighbour_cost,
+            "default_cost": default_cost,
+            "neighbour_distance": neighbour_distance,
+        }
+        return SubstitutionCosts(rows, params)
+
+    def dumps(self):
+        return json.dumps(
+            {
+                "keymap_hash": self.keymap_hash,
+                "params": self.params,
+                "rows": self.rows,
+            }
+        )
+
+    @staticmethod
+    def loads(dumped_str):
+        dumped = json.loads(dumped_str)
+        return SubstitutionCosts(
+            dumped["rows"], dumped["params"], dumped["keymap_hash"]
+        )
+
+    @staticmethod
+    def load_or_build(
+        path,
+        keymap_bin,
+        alias_map,
+        alias_cost=0.25,
+        neighbour_cost=0.5,
+        default_cost=1,
+        neighbour_distance=1.25,
+    ):
+        """
+        Load the matrix persisted at path, rebuilding it from alias_map
+        and writing it back if it is missing or was built from a different
+        keymap .bin or with different costs
+        """
+        bin_hash = keymap_hash(keymap_bin)
+        params = {
+            "alias_cost": alias_cost,
+            "neighbour_cost": neighbour_cost,
+            "default_cost": default_cost,
+            "neighbour_distance": neighbour_distance,
+        }
+        try:
+            with open(path, "r") as costs_file:
+                costs = SubstitutionCosts.loads(costs_file.read())
+            if costs.keymap_hash == bin_hash and costs.params == params:
+                return costs
+        except (OSError, ValueError, KeyError):
+            pass
+
+        costs = SubstitutionCosts.build(alias_map, **params)
+        costs.keymap_hash = bin_hash
+        with open(path, "w") as costs_file:
+            costs_file.write(costs.dumps())
+        return costs
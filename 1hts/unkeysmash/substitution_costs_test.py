@@ -0,0 +1,107 @@
+import os
+import random
+import tempfile
+import unittest
+from .edit_scores import EditScoreTable, get_edit_score, min_edit_score
+from .edit_sequences import EditSequencesConfig, min_edit_sequence_score
+from .substitution_costs import SubstitutionCosts
+
+
+class FakeAliasMap:
+    """
+    The alias tables of a lib1hts.aliasmap.AliasMap, from pairs of linux
+    keycodes aliased to each other
+    """
+
+    def __init__(self, pairs):
+        self.forward_aliases = dict()
+        self.reverse_aliases = dict()
+        for k1, k2 in pairs:
+            self.forward_aliases.setdefault(k1, set()).add(k2)
+            self.reverse_aliases.setdefault(k2, set()).add(k1)
+
+
+# part of halfquerty, mirroring F onto J, D onto K and E onto I
+HALF_QUERTY = FakeAliasMap([(33, 36), (32, 37), (18, 23)])
+
+
+class SubstitutionCostsTest(unittest.TestCase):
+    def setUp(self):
+        self.costs = SubstitutionCosts.build(HALF_QUERTY)
+
+    def test_costs(self):
+        # mirrored across the halves by the keymap
+        self.assertEqual(self.costs.cost("f", "j"), 0.25)
+        self.assertEqual(self.costs.cost("e", "i"), 0.25)
+        # shifted
+        self.assertEqual(self.costs.cost("a", "A"), 0.25)
+        # physically adjacent
+        self.assertEqual(self.costs.cost("f", "g"), 0.5)
+        self.assertEqual(self.costs.cost("f", "r"), 0.5)
+        self.assertEqual(self.costs.cost("f", "p"), 1)
+        # adjacent on the halfquerty board, as j is typed on the f key and
+        # k on the d key
+        self.assertEqual(self.costs.cost("d", "j"), 0.5)
+        self.assertEqual(self.costs.cost("f", "k"), 0.5)
+        self.assertEqual(self.costs.cost("J", "d"), 0.5)
+        self.assertEqual(self.costs.cost("é", "x"), 1)
+
+    def test_no_aliases(self):
+        costs = SubstitutionCosts.build(FakeAliasMap([]))
+        self.assertEqual(costs.cost("f", "j"), 1)
+        self.assertEqual(costs.cost("f", "g"), 0.5)
+        self.assertEqual(costs.cost("d", "j"), 1)
+
+    def test_get_edit_score_matches_sequences(self):
+        config = EditSequencesConfig(
+            score_diff_cutoff=None, substitution_costs=self.costs
+        )
+        rng = random.Random(1)
+        for _ in range(300):
+            target = "".join(rng.choice("fjgp") for _ in range(rng.randint(0, 5)))
+            source = "".join(rng.choice("fjgp") for _ in range(rng.randint(0, 5)))
+            self.assertEqual(
+                get_edit_score(target, source, config),
+                min_edit_sequence_score(target, source, config),
+                (target, source),
+            )
+
+    def test_alias_substitution_ranks_first(self):
+        config = EditSequencesConfig(substitution_costs=self.costs)
+        self.assertLess(
+            get_edit_score("fork", "jork", config),
+            get_edit_score("pork", "jork", config),
+        )
+
+    def test_edit_score_table_and_lower_bound(self):
+        config = EditSequencesConfig(substitution_costs=self.costs)
+        table = EditScoreTable(config)
+        rng = random.Random(2)
+        for _ in range(300):
+            target = "".join(rng.choice("fjgpA") for _ in range(rng.randint(0, 7)))
+            source = "".join(rng.choice("fjgpa") for _ in range(rng.randint(0, 7)))
+            table.sync(target, source)
+            score = get_edit_score(target, source, config)
+            self.assertEqual(table.score(), score, (target, source))
+            if score is not None and len(target) <= len(source):
+                self.assertLessEqual(min_edit_score(len(source), config), score)
+
+    def test_load_or_build(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            path = os.path.join(cache_dir, "subcosts.json")
+            built = SubstitutionCosts.load_or_build(path, b"halfquerty", HALF_QUERTY)
+            # loaded from disk rather than rebuilt from the alias map
+            loaded = SubstitutionCosts.load_or_build(path, b"halfquerty", None)
+            self.assertEqual(loaded.rows, built.rows)
+            self.assertEqual(loaded.keymap_hash, built.keymap_hash)
+
+            # a different keymap invalidates the cached matrix
+            rebuilt = SubstitutionCosts.load_or_build(
+                path, b"default", FakeAliasMap([])
+            )
+            self.assertNotEqual(rebuilt.keymap_hash, built.keymap_hash)
+            self.assertEqual(rebuilt.cost("f", "j"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
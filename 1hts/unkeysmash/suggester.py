@@ -1,34 +1,141 @@
-from .edit_sequences import get_edit_sequences
+import heapq
+from .edit_sequences import min_edit_sequence_score
+from .edit_scores import EditScoreTable, get_edit_score, min_edit_score
+from .vocab_index import BKTree, DeletionIndex, LinearScanIndex
 
 
 class Suggester:
-    def __init__(self, vocab, edit_sequence_config):
+    def __init__(
+        self,
+        vocab,
+        edit_sequence_config,
+        edit_score_engine=min_edit_sequence_score,
+        candidate_index=None,
+        typo_index=None,
+        correction_index=None,
+        suggestion_cache=None,
+        batch_scorer=None,
+    ):
+        """
+        edit_score_engine is called as engine(target, source, config) and
+        returns the minimum edit sequence score, or None if there is no
+        edit sequence. Either edit_sequences.min_edit_sequence_score, the
+        score-only edit_scores.get_edit_score, or an engine object like
+        bitparallel.BitParallelScorer. Engines with a prefix_score method
+        are given whole target words and the length of the prefix to
+        score, rather than the prefix itself. Engines with a score_many
+        method, like vectorized.VectorizedScorer or
+        compact_sequences.PrefixSharingScorer, score whole candidate sets
+        at once.
+
+        candidate_index is one of the vocab_index lookups, built over vocab.
+        Defaults to scanning the whole vocab for each fragment.
+
+        typo_index is an optional vocab_index.DeletionIndex, whose words
+        within a few edits of the fragment are ranked alongside the
+        candidate_index matches. It is rebuilt whenever the vocab changes,
+        and learned words are added to it.
+
+        correction_index is a vocab_index.BKTree over vocab, used by
+        get_full_word_corrections. Built on first use if not given, and
+        again whenever the vocab changes. Learned words are added to it.
+
+        suggestion_cache is an optional suggestion_cache.SuggestionCache for
+        get_prefix_suggestions results, cleared whenever the vocab changes.
+        Words learned with learn_word only drop the results for fragments
+        they contain.
+
+        batch_scorer is an optional batch_scoring.BatchScorer, used to score
+        large candidate sets across a process pool.
+        """
         self.vocab = vocab
         self.edit_sequence_config = edit_sequence_config
+        self.edit_score_engine = edit_score_engine
+        if candidate_index is None:
+            candidate_index = LinearScanIndex(vocab)
+        self.candidate_index = candidate_index
+        self.typo_index = typo_index
+        self.correction_index = correction_index
+        self.suggestion_cache = suggestion_cache
+        self.batch_scorer = batch_scorer
+        self._vocab_generation = vocab.generation
+        # how many of the vocab's learned words have been caught up on
+        self._learned_ct = vocab.learned_ct()
+        # how many candidates the last _select_best had to fully score
+        self.last_scored_count = 0
+        self.reset_narrowing()
 
-    def full_word_match_distance(self, target_word, word_prefix):
+    def _config_key(self):
+        config = self.edit_sequence_config
+        return (
+            config.score_diff_cutoff,
+            config.walk_diff_cutoff,
+            config.scoring_algorithm,
+        )
+
+    def reset_narrowing(self):
         """
-        Match words based on a full word
+        Forget the fragments seen by get_prefix_suggestions so far
+        """
+        # (fragment, candidate_index matches, candidates, suggestions) for
+        # each fragment typed since the start of the current word, each
+        # extending the one before it
+        self._narrowing = []
+        # per candidate EditScoreTables, when scoring with get_edit_score
+        self._score_tables = dict()
 
-        meant for use in typebehind corrections
+    def get_candidates(self, word_prefix, prefix_candidates=None):
         """
-        edit_sequence_candidates = get_edit_sequences(
-            target_word, word_prefix, self.edit_sequence_config
+        Get the words to rank for word_prefix. If prefix_candidates is
+        given, they are the candidate_index matches for a prefix of
+        word_prefix, without any typo_index words, and are narrowed down
+        rather than looked up from scratch.
+        """
+        return self._add_typo_candidates(
+            word_prefix, self._index_candidates(word_prefix, prefix_candidates)
         )
-        if len(edit_sequence_candidates) != 0:
-            edit_sequence_score = 100 + min(
-                self.edit_sequence_config.scoring_algorithm(edit_sequence)
-                for edit_sequence in edit_sequence_candidates
-            )
+
+    def _index_candidates(self, word_prefix, prefix_candidates=None):
+        if prefix_candidates is None:
+            return self.candidate_index.candidates(word_prefix)
+        # only ever the index's own earlier matches, since an index like
+        # TieredIndex reads which of its tiers were searched from them
+        return self.candidate_index.narrow(prefix_candidates, word_prefix)
+
+    def _add_typo_candidates(self, word_prefix, candidates):
+        if self.typo_index is None:
+            return candidates
+        seen = set(candidates)
+        return candidates + [
+            w for w in self.typo_index.candidates(word_prefix) if w not in seen
+        ]
+
+    def _match_distance(self, relative_frequency, edit_target, word_prefix):
+        return self._score_distance(
+            relative_frequency,
+            self.edit_score_engine(edit_target, word_prefix, self.edit_sequence_config),
+        )
+
+    def _score_distance(self, relative_frequency, min_score):
+        if min_score is not None:
+            edit_sequence_score = 100 + min_score
         else:
             # TODO better handle for no available edit sequences
             edit_sequence_score = 200
-        word_frequency_component = 1 - self.vocab.relative_frequency(
-            target_word.lower()
-        )
+        word_frequency_component = 1 - relative_frequency
 
         return edit_sequence_score * word_frequency_component
 
+    def full_word_match_distance(self, target_word, word_prefix):
+        """
+        Match words based on a full word
+
+        meant for use in typebehind corrections
+        """
+        return self._match_distance(
+            self.vocab.relative_frequency(target_word), target_word, word_prefix
+        )
+
     def prefix_match_distance(self, target_word, word_prefix):
         """
         Match words based on the first segment of a word rather than
@@ -36,31 +143,269 @@ class Suggester:
 
         meant for use in typeahead suggestions
         """
-        edit_sequence_candidates = get_edit_sequences(
-            target_word[: len(word_prefix)], word_prefix, self.edit_sequence_config
+        return self._prefix_distance(
+            target_word, self.vocab.relative_frequency(target_word), word_prefix
         )
-        if len(edit_sequence_candidates) != 0:
-            edit_sequence_score = 100 + min(
-                self.edit_sequence_config.scoring_algorithm(edit_sequence)
-                for edit_sequence in edit_sequence_candidates
+
+    def _prefix_distance(self, target_word, relative_frequency, word_prefix):
+        # prefix_match_distance, for a word already looked up in the vocab's
+        # FrequencyTable
+        engine = self.edit_score_engine
+        if hasattr(engine, "prefix_score"):
+            # engines that keep per word state, so it is looked up by the
+            # whole word rather than the prefix
+            return self._score_distance(
+                relative_frequency,
+                engine.prefix_score(
+                    target_word,
+                    len(word_prefix),
+                    word_prefix,
+                    self.edit_sequence_config,
+                ),
             )
-        else:
-            # TODO better handle for no available edit sequences
-            edit_sequence_score = 200
-        word_frequency_component = 1 - self.vocab.relative_frequency(
-            target_word.lower()
+        return self._match_distance(
+            relative_frequency, target_word[: len(word_prefix)], word_prefix
         )
 
-        return edit_sequence_score * word_frequency_component
+    def score_batch(self, word_prefix, words):
+        """
+        Get prefix_match_distance for each of words, farming the work out
+        to batch_scorer's process pool if there is one and words is big
+        enough to be worth it
+        """
+        if (
+            self.batch_scorer is not None
+            and len(words) >= self.batch_scorer.inline_threshold
+        ):
+            return self.batch_scorer.score(self, word_prefix, words)
+        word_prefix_lower = word_prefix.lower()
+        frequency_table = self.vocab.frequency_table()
+        canonical_words = frequency_table.words
+        frequency_at = frequency_table.frequency_at
+        table_idxs = [frequency_table.index(w) for w in words]
+        if hasattr(self.edit_score_engine, "score_many"):
+            scores = self.edit_score_engine.score_many(
+                [canonical_words[i][: len(word_prefix)] for i in table_idxs],
+                word_prefix_lower,
+                self.edit_sequence_config,
+            )
+            return [
+                self._score_distance(frequency_at(i), score)
+                for i, score in zip(table_idxs, scores)
+            ]
+        return [
+            self._prefix_distance(
+                canonical_words[i], frequency_at(i), word_prefix_lower
+            )
+            for i in table_idxs
+        ]
+
+    def _min_edit_score(self, source_len):
+        """
+        Get a lower bound on what edit_score_engine can return for a
+        source_len character fragment, or None if there isn't a known one
+        """
+        engine = self.edit_score_engine
+        if engine is get_edit_score or engine is min_edit_sequence_score:
+            return min_edit_score(source_len, self.edit_sequence_config)
+        elif hasattr(engine, "min_score"):
+            return engine.min_score(source_len, self.edit_sequence_config)
+        return None
+
+    def _select_best(self, candidates, match_distance, min_score, k=5):
+        """
+        Get the k candidates with the smallest match_distance, in the same
+        order sorting all of them would give.
+
+        Candidates are visited in order of the lowest distance they could
+        possibly reach given min_score and their word frequency, and only
+        fully scored while that could still beat the k-th best so far.
+
+        match_distance is given each candidate's index in the vocab's
+        FrequencyTable, so each one is only looked up once.
+        """
+        frequency_table = self.vocab.frequency_table()
+        table_idxs = [frequency_table.index(w) for w in candidates]
+        if min_score is None:
+            self.last_scored_count = len(candidates)
+            return [
+                candidates[idx]
+                for idx in sorted(
+                    range(len(candidates)),
+                    key=lambda idx: match_distance(table_idxs[idx]),
+                )[0:k]
+            ]
+
+        self.last_scored_count = 0
+        base = 100 + min_score
+        frequency_at = frequency_table.frequency_at
+        bounded = []
+        for idx, w in enumerate(candidates):
+            word_frequency_component = 1 - frequency_at(table_idxs[idx])
+            # a negative base only gets less negative as frequency grows
+            bound = base * word_frequency_component if base >= 0 else base
+            bounded.append((bound, idx, w))
+        heapq.heapify(bounded)
+
+        # max heap of the best k as (-distance, -idx, word)
+        best = []
+        while len(bounded) != 0:
+            bound, idx, w = heapq.heappop(bounded)
+            if len(best) == k and (bound, idx) > (-best[0][0], -best[0][1]):
+                break
+            self.last_scored_count += 1
+            entry = (-match_distance(table_idxs[idx]), -idx, w)
+            if len(best) < k:
+                heapq.heappush(best, entry)
+            elif entry > best[0]:
+                heapq.heapreplace(best, entry)
+
+        return [w for _, _, w in sorted(best, reverse=True)]
+
+    def _table_prefix_distance(self, target_word, relative_frequency, word_prefix):
+        """
+        _prefix_distance for get_edit_score, growing the candidate's
+        EditScoreTable from the previous fragment rather than starting over
+        """
+        table = self._score_tables.get(target_word)
+        if table is None:
+            table = EditScoreTable(self.edit_sequence_config)
+            self._score_tables[target_word] = table
+        table.sync(target_word[: len(word_prefix)], word_prefix)
+        return self._score_distance(relative_frequency, table.score())
+
+    def _sync_vocab(self):
+        """
+        Drop the suggestions the vocab changed under since the last call
+        """
+        vocab = self.vocab
+        learned = vocab.learned_since(self._learned_ct)
+        if self._vocab_generation != vocab.generation or learned is None:
+            self._vocab_generation = vocab.generation
+            self._learned_ct = vocab.learned_ct()
+            self.reset_narrowing()
+            if self.suggestion_cache is not None:
+                self.suggestion_cache.clear()
+            # rebuilt from the vocab on next use
+            self.correction_index = None
+            if self.typo_index is not None:
+                self.typo_index = DeletionIndex(
+                    vocab.iterwords(),
+                    self.typo_index.max_distance,
+                    self.typo_index.prefix_len,
+                )
+            return
+
+        # a learned word is a new candidate, or a more frequent one, only
+        # for the fragments it contains
+        for word, _ in learned:
+            word_lower = word.lower()
+            # each fragment extends the one before it, so the ones in the
+            # word are at the bottom of the stack, and the rest still
+            # narrow from each other
+            self._narrowing = [
+                entry for entry in self._narrowing if entry[0].lower() not in word_lower
+            ]
+            if self.suggestion_cache is not None:
+                self.suggestion_cache.discard(lambda key: key[0].lower() in word_lower)
+            if self.correction_index is not None:
+                self.correction_index.add(word)
+            if self.typo_index is not None:
+                self.typo_index.add(word)
+        self._learned_ct = vocab.learned_ct()
 
     def get_prefix_suggestions(self, word_prefix):
+        """
+        Get the best 5 suggestions for the word being typed.
+
+        Keeps a stack of the fragments typed so far, so typing another
+        character only narrows the previous fragment's candidates, and
+        backspacing returns to an earlier fragment's suggestions.
+        """
+        self._sync_vocab()
+
+        if self.suggestion_cache is not None:
+            cache_key = (word_prefix, self._config_key())
+            suggestions = self.suggestion_cache.get(cache_key)
+            if suggestions is not None:
+                return suggestions
+
+        narrowing = self._narrowing
+        while len(narrowing) != 0 and not word_prefix.startswith(narrowing[-1][0]):
+            narrowing.pop()
+
+        if len(narrowing) == 0 or len(narrowing[-1][0]) == 0:
+            # a new word, even if the UI's empty fragment after the last one
+            # is still on the stack, so the last word's tables aren't needed
+            self._score_tables = dict()
+
+        if len(narrowing) == 0:
+            index_candidates = self._index_candidates(word_prefix)
+        elif narrowing[-1][0] == word_prefix:
+            return list(narrowing[-1][3])
+        else:
+            index_candidates = self._index_candidates(word_prefix, narrowing[-1][1])
+        candidates = self._add_typo_candidates(word_prefix, index_candidates)
+
+        word_prefix_lower = word_prefix.lower()
+        frequency_table = self.vocab.frequency_table()
+        canonical_words = frequency_table.words
+        frequency_at = frequency_table.frequency_at
+        if self.edit_score_engine is get_edit_score:
+            prefix_distance = self._table_prefix_distance
+        else:
+            prefix_distance = self._prefix_distance
+        # todo keysmash & repetition
+        if hasattr(self.edit_score_engine, "score_many") or (
+            self.batch_scorer is not None
+            and len(candidates) >= self.batch_scorer.inline_threshold
+        ):
+            distances = self.score_batch(word_prefix, candidates)
+            self.last_scored_count = len(candidates)
+            suggestions = [
+                candidates[i]
+                for i in heapq.nsmallest(
+                    5, range(len(candidates)), key=lambda i: (distances[i], i)
+                )
+            ]
+        else:
+            suggestions = self._select_best(
+                candidates,
+                lambda i: prefix_distance(
+                    canonical_words[i], frequency_at(i), word_prefix_lower
+                ),
+                self._min_edit_score(len(word_prefix)),
+            )
+
+        narrowing.append((word_prefix, index_candidates, candidates, suggestions))
+        if self.suggestion_cache is not None:
+            self.suggestion_cache.put(cache_key, suggestions)
+        return list(suggestions)
+
+    def get_full_word_corrections(self, word, k):
+        """
+        Get the best matches for a completed word among the vocab words
+        within levenshtein distance k of it
+
+        meant for use in typebehind corrections
+        """
+        self._sync_vocab()
+        if self.correction_index is None:
+            self.correction_index = BKTree(self.vocab.iterwords())
+        word_lower = word.lower()
+        frequency_table = self.vocab.frequency_table()
+
+        def match_distance(w):
+            idx = frequency_table.index(w)
+            return self._match_distance(
+                frequency_table.frequency_at(idx),
+                frequency_table.words[idx],
+                word_lower,
+            )
+
         return list(
             sorted(
-                # todo keysmash & repetition
-                [w for w in self.vocab.iterwords() if word_prefix in w],
-                key=lambda w: self.prefix_match_distance(
-                    w.lower(), word_prefix.lower()
-                ),
-                reverse=False,
+                [w for _, w in self.correction_index.find(word, k)],
+                key=match_distance,
             )[0:5]
         )
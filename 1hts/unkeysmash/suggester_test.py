@@ -0,0 +1,329 @@
+import random
+import threading
+import time
+import unittest
+from .batch_scoring import BatchScorer
+from .bitparallel import BitParallelScorer
+from .edit_scores import get_edit_score
+from .edit_sequences import EditSequencesConfig
+from .suggester import Suggester
+from .vocab import LEARNED_LOG_SIZE
+from .suggestion_cache import SuggestionCache, entry_size
+from .suggestion_worker import SuggestionWorker
+from .vocab_index import DeletionIndex, PrefixIndex, TieredIndex
+from .vocab_index_test import make_vocab, random_words
+
+
+class FakeTkRoot:
+    def __init__(self):
+        self.callbacks = dict()
+        self.next_id = 0
+
+    def after(self, ms, callback):
+        self.next_id += 1
+        self.callbacks[self.next_id] = callback
+        return self.next_id
+
+    def after_cancel(self, after_id):
+        self.callbacks.pop(after_id, None)
+
+    def run_pending(self):
+        callbacks = list(self.callbacks.values())
+        self.callbacks.clear()
+        for callback in callbacks:
+            callback()
+
+
+class BlockingSuggester:
+    def __init__(self):
+        self.release = threading.Event()
+        self.computed = []
+
+    def get_prefix_suggestions(self, word_prefix):
+        if len(self.computed) == 0:
+            self.release.wait()
+        self.computed.append(word_prefix)
+        return [word_prefix + "!"]
+
+
+class SuggesterTest(unittest.TestCase):
+    def assert_narrowing_matches_fresh(self, make_suggester, typed):
+        suggester = make_suggester()
+        for fragment in typed:
+            self.assertEqual(
+                suggester.get_prefix_suggestions(fragment),
+                make_suggester().get_prefix_suggestions(fragment),
+                fragment,
+            )
+
+    def test_narrowing_matches_fresh_suggestions(self):
+        rng = random.Random(1)
+        vocab = make_vocab(random_words(rng, 400, alphabet="abcdAB"))
+        typed = ["a", "ab", "abc", "abcd", "abc", "ab", "abd", "", "b", "ba", "c"]
+        config = EditSequencesConfig()
+        for engine in [get_edit_score, None]:
+            kwargs = dict() if engine is None else dict(edit_score_engine=engine)
+            self.assert_narrowing_matches_fresh(
+                lambda: Suggester(vocab, config, **kwargs), typed
+            )
+            self.assert_narrowing_matches_fresh(
+                lambda: Suggester(
+                    vocab,
+                    config,
+                    candidate_index=PrefixIndex(vocab),
+                    typo_index=DeletionIndex(vocab.iterwords()),
+                    **kwargs
+                ),
+                typed,
+            )
+
+    def test_narrowing_tiered_index_with_typo_candidates(self):
+        # the typo index adds the cold "Thanx" to the candidates for "th",
+        # which TieredIndex must not take to mean its cold tier was searched
+        hot = ["the", "that", "this", "they", "then", "there", "their"]
+        vocab = make_vocab(["Thanx", "anthxy"] + hot)
+
+        def make_suggester():
+            return Suggester(
+                vocab,
+                EditSequencesConfig(),
+                candidate_index=TieredIndex(vocab, hot_size=len(hot), min_hot=5),
+                typo_index=DeletionIndex(vocab.iterwords()),
+            )
+
+        suggester = make_suggester()
+        for fragment in ["th", "thx"]:
+            suggester.get_prefix_suggestions(fragment)
+            self.assertEqual(
+                sorted(suggester._narrowing[-1][2]),
+                sorted(make_suggester().get_candidates(fragment)),
+                fragment,
+            )
+        self.assertIn("anthxy", suggester._narrowing[-1][2])
+
+    def test_score_tables_reset_between_words(self):
+        vocab = make_vocab(["apple", "apply", "banana", "band", "bandit"])
+        suggester = Suggester(
+            vocab, EditSequencesConfig(), edit_score_engine=get_edit_score
+        )
+        # the UI asks for "" after every space, so it stays on the stack
+        for fragment in ["", "a", "ap", "", "b", "ba"]:
+            suggester.get_prefix_suggestions(fragment)
+        self.assertEqual(suggester._narrowing[0][0], "")
+        self.assertEqual(set(suggester._score_tables), set(suggester._narrowing[-1][2]))
+
+    def test_top_k_matches_full_sort(self):
+        rng = random.Random(2)
+        words = random_words(rng, 600, alphabet="abcdAB")
+        vocab = make_vocab(words)
+        # skew frequencies so a few words dominate
+        for w in words[:10]:
+            vocab._wordfreq[w.lower()] = 5000
+        vocab._update_frequencies()
+        config = EditSequencesConfig()
+        for engine in [get_edit_score, BitParallelScorer()]:
+            for fragment in ["a", "ab", "Ab", "abc", "dab", "bbbb"]:
+                suggester = Suggester(vocab, config, edit_score_engine=engine)
+                candidates = suggester.get_candidates(fragment)
+                expected = sorted(
+                    candidates,
+                    key=lambda w: suggester.prefix_match_distance(
+                        w.lower(), fragment.lower()
+                    ),
+                )[0:5]
+                self.assertEqual(
+                    suggester.get_prefix_suggestions(fragment), expected, fragment
+                )
+                self.assertLessEqual(suggester.last_scored_count, len(candidates))
+
+    def test_top_k_prunes(self):
+        vocab = make_vocab(["zzzaa", "zzzab", "zzzac", "zzzad", "zzzae", "zzzaf"])
+        for w in ["zzzaa", "zzzab", "zzzac", "zzzad", "zzzae"]:
+            vocab._wordfreq[w] = 10000
+        vocab._update_frequencies()
+        suggester = Suggester(vocab, EditSequencesConfig())
+        self.assertEqual(
+            sorted(suggester.get_prefix_suggestions("zzz")),
+            ["zzzaa", "zzzab", "zzzac", "zzzad", "zzzae"],
+        )
+        self.assertEqual(suggester.last_scored_count, 5)
+
+    def test_suggestion_cache(self):
+        vocab = make_vocab(["keyboard", "keysmash", "layer"])
+        cache = SuggestionCache()
+        suggester = Suggester(vocab, EditSequencesConfig(), suggestion_cache=cache)
+        first = suggester.get_prefix_suggestions("key")
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+        suggester.get_prefix_suggestions("l")
+        self.assertEqual(suggester.get_prefix_suggestions("key"), first)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+        suggester.edit_sequence_config.walk_diff_cutoff = 4
+        suggester.get_prefix_suggestions("key")
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+        vocab.consume_md_str("keylogger")
+        self.assertIn("keylogger", suggester.get_prefix_suggestions("key"))
+        self.assertEqual(len(cache.entries), 1)
+
+    def test_learned_word_drops_only_fragments_it_contains(self):
+        vocab = make_vocab(["keyboard", "keysmash", "layer", "lattice"])
+        cache = SuggestionCache()
+        suggester = Suggester(vocab, EditSequencesConfig(), suggestion_cache=cache)
+        for fragment in ["", "l", "la", "lay", "", "k", "ke"]:
+            suggester.get_prefix_suggestions(fragment)
+
+        vocab.learn_word("keylogger")
+        self.assertIn("keylogger", suggester.get_prefix_suggestions("ke"))
+        self.assertEqual([entry[0] for entry in suggester._narrowing], ["ke"])
+        self.assertEqual(sorted(key[0] for key in cache.entries), ["ke", "la", "lay"])
+        self.assertEqual(
+            cache.size_bytes,
+            sum(entry_size(key, results) for key, results in cache.entries.items()),
+        )
+
+    def test_learned_log_trimmed_past_suggester(self):
+        vocab = make_vocab(["keyboard", "keysmash", "layer"])
+        cache = SuggestionCache()
+        suggester = Suggester(vocab, EditSequencesConfig(), suggestion_cache=cache)
+        suggester.get_prefix_suggestions("la")
+        for _ in range(LEARNED_LOG_SIZE + 1):
+            vocab.learn_word("keylogger")
+        # too far behind to catch up on just the learned words
+        suggester.get_prefix_suggestions("ke")
+        self.assertEqual([key[0] for key in cache.entries], ["ke"])
+
+    def test_corrections_follow_vocab_changes(self):
+        vocab = make_vocab(["keyboard", "keysmash", "layer", "lager"])
+        suggester = Suggester(vocab, EditSequencesConfig())
+        self.assertEqual(
+            sorted(suggester.get_full_word_corrections("laxer", 1)), ["lager", "layer"]
+        )
+
+        vocab.learn_word("laser")
+        self.assertIn("laser", suggester.get_full_word_corrections("laxer", 1))
+
+        vocab.prune(max_size=3)
+        corrections = suggester.get_full_word_corrections("laxer", 1)
+        self.assertEqual(
+            sorted(corrections), sorted(w for w in vocab.iterwords() if w[0] == "l")
+        )
+
+    def test_typo_index_follows_vocab_changes(self):
+        vocab = make_vocab(["keyboard", "keysmash", "layer", "lager"])
+        suggester = Suggester(
+            vocab,
+            EditSequencesConfig(),
+            candidate_index=PrefixIndex(vocab),
+            typo_index=DeletionIndex(vocab.iterwords()),
+        )
+        vocab.learn_word("laser")
+        self.assertIn("laser", suggester.get_prefix_suggestions("lxse"))
+
+        vocab.prune(max_size=3)
+        suggester.get_prefix_suggestions("lxge")
+        self.assertEqual(sorted(suggester.typo_index.words), sorted(vocab.iterwords()))
+
+    def test_suggestion_cache_evicts_lru(self):
+        cache = SuggestionCache(max_bytes=1000)
+        for i in range(20):
+            cache.put(("frag%d" % i, None), ["word%d" % i])
+            cache.get(("frag0", None))
+        self.assertLessEqual(cache.size_bytes, 1000)
+        self.assertGreater(cache.evictions, 0)
+        self.assertEqual(cache.evictions + len(cache.entries), 20)
+        self.assertEqual(cache.get(("frag0", None)), ["word0"])
+        self.assertEqual(cache.get(("frag1", None)), None)
+
+    def test_suggestion_worker_latest_request_wins(self):
+        root = FakeTkRoot()
+        suggester = BlockingSuggester()
+        delivered = []
+        worker = SuggestionWorker(
+            suggester, root, lambda prefix, sugg: delivered.append((prefix, sugg))
+        )
+        try:
+            worker.request("a")
+            time.sleep(0.05)
+            worker.request("ab")
+            worker.request("abc")
+            suggester.release.set()
+
+            deadline = time.time() + 5
+            while len(delivered) == 0 and time.time() < deadline:
+                root.run_pending()
+                time.sleep(0.01)
+        finally:
+            worker.stop()
+
+        self.assertEqual(suggester.computed, ["a", "abc"])
+        self.assertEqual(delivered, [("abc", ["abc!"])])
+
+    def test_suggestion_worker_updates_vocab_between_requests(self):
+        root = FakeTkRoot()
+        suggester = BlockingSuggester()
+        delivered = []
+        worker = SuggestionWorker(
+            suggester, root, lambda prefix, sugg: delivered.append((prefix, sugg))
+        )
+        try:
+            worker.request("a")
+            time.sleep(0.05)
+            worker.update_vocab(lambda: suggester.computed.append("update"))
+            worker.request("ab")
+            suggester.release.set()
+
+            deadline = time.time() + 5
+            while len(delivered) == 0 and time.time() < deadline:
+                root.run_pending()
+                time.sleep(0.01)
+        finally:
+            worker.stop()
+
+        self.assertEqual(suggester.computed, ["a", "update", "ab"])
+
+    def test_score_batch_matches_inline(self):
+        rng = random.Random(3)
+        vocab = make_vocab(random_words(rng, 300, alphabet="abcdAB"))
+        words = list(vocab.iterwords())
+        batch_scorer = BatchScorer(max_workers=2, inline_threshold=50, chunk_size=40)
+        try:
+            pooled = Suggester(
+                vocab,
+                EditSequencesConfig(),
+                edit_score_engine=get_edit_score,
+                batch_scorer=batch_scorer,
+            )
+            inline = Suggester(
+                vocab, EditSequencesConfig(), edit_score_engine=get_edit_score
+            )
+            self.assertEqual(
+                pooled.score_batch("abd", words), inline.score_batch("abd", words)
+            )
+            self.assertEqual(
+                pooled.get_prefix_suggestions("a"), inline.get_prefix_suggestions("a")
+            )
+
+            # learned words are sent to the running pool rather than
+            # restarting it
+            executor = batch_scorer._executor
+            for _ in range(20):
+                vocab.learn_word("abdab")
+            vocab.learn_word("Abda")
+            self.assertEqual(
+                pooled.score_batch("abd", words + ["abdab"]),
+                inline.score_batch("abd", words + ["abdab"]),
+            )
+            self.assertIs(batch_scorer._executor, executor)
+
+            vocab.consume_md_str("aaaaaaa " * 50)
+            self.assertEqual(
+                pooled.score_batch("aaa", words), inline.score_batch("aaa", words)
+            )
+            self.assertIsNot(batch_scorer._executor, executor)
+        finally:
+            batch_scorer.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import sys
+from collections import OrderedDict
+
+# rough per-entry cost of the OrderedDict slot, key tuple and result list
+ENTRY_OVERHEAD_BYTES = 200
+
+
+def entry_size(key, results):
+    return (
+        ENTRY_OVERHEAD_BYTES
+        + sys.getsizeof(key[0])
+        + sum(sys.getsizeof(w) for w in results)
+    )
+
+
+class SuggestionCache:
+    """
+    Bounded LRU map from (fragment, config key) to ranked suggestions.
+
+    Entries are evicted least recently used first once their estimated
+    size passes max_bytes.
+    """
+
+    def __init__(self, max_bytes=1 << 20):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        results = self.entries.get(key)
+        if results is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return list(results)
+
+    def put(self, key, results):
+        if key in self.entries:
+            self.size_bytes -= entry_size(key, self.entries.pop(key))
+        results = tuple(results)
+        self.entries[key] = results
+        self.size_bytes += entry_size(key, results)
+        while self.size_bytes > self.max_bytes and len(self.entries) != 0:
+            evicted_key, evicted = self.entries.popitem(last=False)
+            self.size_bytes -= entry_size(evicted_key, evicted)
+            self.evictions += 1
+
+    def discard(self, should_discard):
+        """
+        Drop the entries whose keys should_discard returns true for
+        """
+        for key in [key for key in self.entries if should_discard(key)]:
+            self.size_bytes -= entry_size(key, self.entries.pop(key))
+
+    def clear(self):
+        self.entries.clear()
+        self.size_bytes = 0
@@ -0,0 +1,113 @@
+import queue
+import threading
+
+
+class SuggestionWorker:
+    """
+    Computes prefix suggestions on a background thread so the Tk loop
+    never waits on a slow suggestion.
+
+    Only the most recent request matters: requests made while the worker
+    is busy replace each other, and results for anything but the latest
+    request are dropped. Results are handed back to on_suggestions from
+    the Tk loop itself, by polling with tk_root.after(), since Tk must not
+    be touched from the worker thread.
+    """
+
+    def __init__(self, suggester, tk_root, on_suggestions, poll_ms=10):
+        self.suggester = suggester
+        self.tk_root = tk_root
+        self.on_suggestions = on_suggestions
+        self.poll_ms = poll_ms
+
+        self._lock = threading.Condition()
+        self._pending = None
+        # vocab changes to make before the next request
+        self._updates = []
+        self._latest_id = 0
+        self._stopped = False
+        self._results = queue.Queue()
+
+        self._thread = threading.Thread(
+            target=self._run, name="suggestion-worker", daemon=True
+        )
+        self._thread.start()
+        self._poll_after_id = self.tk_root.after(self.poll_ms, self._poll)
+
+    def request(self, word_prefix):
+        """
+        Ask for suggestions for word_prefix, superseding earlier requests
+        """
+        with self._lock:
+            self._latest_id += 1
+            self._pending = (self._latest_id, word_prefix)
+            self._lock.notify()
+            return self._latest_id
+
+    def update_vocab(self, update):
+        """
+        Call update() on the worker thread before the next request, for
+        changes to the suggester's vocab that mustn't happen while it is
+        scoring
+        """
+        with self._lock:
+            self._updates.append(update)
+            self._lock.notify()
+
+    def stop(self):
+        with self._lock:
+            self._stopped = True
+            self._lock.notify()
+        self.tk_root.after_cancel(self._poll_after_id)
+
+    def _is_latest(self, request_id):
+        with self._lock:
+            return request_id == self._latest_id
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while (
+                    self._pending is None
+                    and len(self._updates) == 0
+                    and not self._stopped
+                ):
+                    self._lock.wait()
+                updates = self._updates
+                self._updates = []
+                pending = None if self._stopped else self._pending
+                self._pending = None
+
+            for update in updates:
+                try:
+                    update()
+                except Exception as e:
+                    print("suggestion worker failed to update vocab", e)
+            if pending is None:
+                if self._stopped:
+                    return
+                continue
+            request_id, word_prefix = pending
+
+            try:
+                suggestions = self.suggester.get_prefix_suggestions(word_prefix)
+            except Exception as e:
+                print("suggestion worker failed on", repr(word_prefix), e)
+                continue
+
+            if self._is_latest(request_id):
+                self._results.put((request_id, word_prefix, suggestions))
+
+    def _poll(self):
+        latest = None
+        while True:
+            try:
+                latest = self._results.get_nowait()
+            except queue.Empty:
+                break
+
+        if latest is not None and self._is_latest(latest[0]):
+            _, word_prefix, suggestions = latest
+            self.on_suggestions(word_prefix, suggestions)
+
+        self._poll_after_id = self.tk_root.after(self.poll_ms, self._poll)
@@ -0,0 +1,192 @@
+from .edit_sequences import EditSequencesConfig
+from .edit_scores import min_edit_score, segment_costs
+from .substitution_costs import ALPHABET_SIZE
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# get_edit_score run over many targets at once with numpy.
+#
+# Targets of the same length are packed into a (words, length) matrix of
+# code points, and each row of the DP is computed for all of them in
+# lockstep, so one fragment is scored against a whole candidate set with
+# O(len(target)) array ops rather than a python DP per word.
+
+
+def pack_words(words, length):
+    """
+    Pack words that are all length characters long into a uint32 matrix
+    """
+    packed = np.frombuffer("".join(words).encode("utf-32-le"), dtype=np.uint32)
+    return packed.reshape(len(words), length)
+
+
+def _score_same_length(words, target_len, source, costs, walk_cutoff, sub_matrix):
+    (
+        (mat_open, mat_ext),
+        (del_open, del_ext),
+        (ins_open, ins_ext),
+        (sub_open, sub_ext),
+    ) = costs
+    inf = np.inf
+    word_ct = len(words)
+    source_len = len(source)
+    if walk_cutoff is None:
+        walk_cutoff = max(target_len, source_len)
+    if target_len == 0 and source_len == 0:
+        return np.full(word_ct, inf)
+
+    targets = pack_words(words, target_len)
+    source_arr = pack_words([source], source_len)[0]
+    if sub_matrix is not None:
+        target_idxs = np.minimum(targets, ALPHABET_SIZE)
+        source_idxs = np.minimum(source_arr, ALPHABET_SIZE)
+
+    # per word length of the common prefix with source
+    shared_len = min(target_len, source_len)
+    matching = targets[:, :shared_len] == source_arr[:shared_len]
+    common_len = np.cumprod(matching, axis=1).sum(axis=1)
+
+    cols = np.arange(source_len + 1)
+
+    # row 0: inserting a prefix of source
+    prev_mat = np.full((word_ct, source_len + 1), inf)
+    prev_del = np.full((word_ct, source_len + 1), inf)
+    prev_sub = np.full((word_ct, source_len + 1), inf)
+    ins_run = np.where(
+        (cols >= 1) & (cols <= walk_cutoff), ins_open + ins_ext * (cols - 1), inf
+    )
+    prev_ins = np.broadcast_to(ins_run, (word_ct, source_len + 1)).copy()
+
+    for i in range(1, target_len + 1):
+        out_of_band = np.abs(cols - i) > walk_cutoff
+        eq = targets[:, i - 1 : i] == source_arr
+        if sub_matrix is None:
+            sub_cost = sub_ext
+        else:
+            sub_cost = sub_matrix[np.ix_(target_idxs[:, i - 1], source_idxs)]
+
+        cur_del = np.empty((word_ct, source_len + 1))
+        cur_del[:, 0] = del_open + del_ext * (i - 1) if i <= walk_cutoff else inf
+        cur_del[:, 1:] = np.minimum(
+            prev_del[:, 1:] + del_ext,
+            np.minimum(prev_mat[:, 1:], prev_sub[:, 1:]) + del_open,
+        )
+
+        cur_mat = np.full((word_ct, source_len + 1), inf)
+        cur_sub = np.full((word_ct, source_len + 1), inf)
+        diag_mat = prev_mat[:, :-1]
+        diag_del = prev_del[:, :-1]
+        diag_ins = prev_ins[:, :-1]
+        diag_sub = prev_sub[:, :-1]
+        cur_mat[:, 1:] = np.where(
+            eq,
+            np.minimum(
+                diag_mat + mat_ext,
+                np.minimum(np.minimum(diag_del, diag_ins), diag_sub) + mat_open,
+            ),
+            inf,
+        )
+        cur_sub[:, 1:] = np.where(
+            eq,
+            inf,
+            np.minimum(
+                diag_sub + sub_cost,
+                np.minimum(np.minimum(diag_del, diag_ins), diag_mat)
+                + (sub_open - sub_ext)
+                + sub_cost,
+            ),
+        )
+        if i == 1 and source_len >= 1 and walk_cutoff >= 1:
+            # a lone SUB, formed from a DEL and INS off of the empty cell
+            lone_sub = (
+                sub_open if sub_matrix is None else sub_open - sub_ext + sub_cost[:, 0]
+            )
+            cur_sub[:, 1] = np.where(eq[:, 0], inf, lone_sub)
+
+        # matching prefixes only ever produce a single MAT
+        if i <= source_len:
+            prefix = common_len >= i
+            cur_mat[prefix, i] = mat_open
+            cur_sub[prefix, i] = inf
+            cur_del[prefix, i] = inf
+
+        cur_mat[:, out_of_band] = inf
+        cur_sub[:, out_of_band] = inf
+        cur_del[:, out_of_band] = inf
+
+        # INS runs along the row, so it is the one part filled column by column
+        cur_ins = np.full((word_ct, source_len + 1), inf)
+        left_mat_sub = np.minimum(cur_mat, cur_sub)
+        for j in range(1, source_len + 1):
+            # masked before the next column reads it, so no run passes
+            # through a cell the scalar DP leaves empty
+            if out_of_band[j]:
+                continue
+            cur_ins[:, j] = np.minimum(
+                cur_ins[:, j - 1] + ins_ext, left_mat_sub[:, j - 1] + ins_open
+            )
+            if j == i:
+                cur_ins[prefix, j] = inf
+
+        prev_mat, prev_del, prev_ins, prev_sub = cur_mat, cur_del, cur_ins, cur_sub
+
+    return np.minimum(
+        np.minimum(prev_mat[:, source_len], prev_del[:, source_len]),
+        np.minimum(prev_ins[:, source_len], prev_sub[:, source_len]),
+    )
+
+
+class VectorizedScorer:
+    """
+    Edit score engine for Suggester that scores whole candidate sets with
+    numpy through score_many, giving the same scores as get_edit_score.
+    """
+
+    def __init__(self):
+        if np is None:
+            raise ImportError("VectorizedScorer requires numpy")
+        self._sub_matrix = (None, None)
+
+    def min_score(self, source_len, config=EditSequencesConfig()):
+        return min_edit_score(source_len, config)
+
+    def score_many(self, targets, source, config=EditSequencesConfig()):
+        """
+        Get get_edit_score(target, source, config) for each of targets
+        """
+        costs = segment_costs(config.scoring_algorithm)
+        sub_matrix = None
+        if config.substitution_costs is not None:
+            sub_costs, sub_matrix = self._sub_matrix
+            if sub_costs is not config.substitution_costs:
+                sub_matrix = np.array(config.substitution_costs.rows, dtype=np.float64)
+                self._sub_matrix = (config.substitution_costs, sub_matrix)
+        by_length = dict()
+        for idx, target in enumerate(targets):
+            by_length.setdefault(len(target), []).append(idx)
+
+        scores = [None] * len(targets)
+        for target_len, idxs in by_length.items():
+            if (
+                config.walk_diff_cutoff is not None
+                and abs(target_len - len(source)) > config.walk_diff_cutoff
+            ):
+                continue
+            group_scores = _score_same_length(
+                [targets[idx] for idx in idxs],
+                target_len,
+                source,
+                costs,
+                config.walk_diff_cutoff,
+                sub_matrix,
+            )
+            for idx, score in zip(idxs, group_scores.tolist()):
+                if score != np.inf:
+                    scores[idx] = score
+        return scores
+
+    def __call__(self, target, source, config=EditSequencesConfig()):
+        return self.score_many([target], source, config)[0]
@@ -0,0 +1,76 @@
+import random
+import unittest
+from .edit_scores import get_edit_score
+from .edit_sequences import EditSequencesConfig, min_edit_sequence_score
+from .substitution_costs import SubstitutionCosts
+from .substitution_costs_test import HALF_QUERTY
+from .suggester import Suggester
+from .vectorized import VectorizedScorer, np
+from .vocab_index_test import make_vocab, random_words
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class VectorizedTest(unittest.TestCase):
+    def test_score_many_matches_get_edit_score(self):
+        rng = random.Random(1)
+        scorer = VectorizedScorer()
+        for config in [
+            EditSequencesConfig(),
+            EditSequencesConfig(walk_diff_cutoff=2),
+            EditSequencesConfig(walk_diff_cutoff=0),
+            EditSequencesConfig(walk_diff_cutoff=None),
+        ]:
+            for _ in range(40):
+                source = "".join(rng.choice("abc") for _ in range(rng.randint(0, 7)))
+                targets = [
+                    "".join(rng.choice("abc") for _ in range(rng.randint(0, 9)))
+                    for _ in range(30)
+                ]
+                self.assertEqual(
+                    scorer.score_many(targets, source, config),
+                    [get_edit_score(target, source, config) for target in targets],
+                    source,
+                )
+
+    def test_score_many_no_ins_through_prefix_match(self):
+        # a DEL, MAT, INS path through the matched prefix cell (3, 3)
+        scorer = VectorizedScorer()
+        config = EditSequencesConfig(score_diff_cutoff=None)
+        self.assertEqual(get_edit_score("abb", "abbfs", config), -11)
+        self.assertEqual(min_edit_sequence_score("abb", "abbfs", config), -11)
+        self.assertEqual(scorer.score_many(["abb"], "abbfs", config), [-11])
+        self.assertEqual(scorer.score_many(["abb"], "abbfs"), [-11])
+
+    def test_score_many_substitution_costs(self):
+        rng = random.Random(3)
+        scorer = VectorizedScorer()
+        config = EditSequencesConfig(
+            substitution_costs=SubstitutionCosts.build(HALF_QUERTY)
+        )
+        for _ in range(40):
+            source = "".join(rng.choice("fjgp") for _ in range(rng.randint(0, 7)))
+            targets = [
+                "".join(rng.choice("fjgpé") for _ in range(rng.randint(0, 9)))
+                for _ in range(30)
+            ]
+            self.assertEqual(
+                scorer.score_many(targets, source, config),
+                [get_edit_score(target, source, config) for target in targets],
+                source,
+            )
+
+    def test_suggester_backend(self):
+        rng = random.Random(2)
+        vocab = make_vocab(random_words(rng, 400, alphabet="abcdAB"))
+        config = EditSequencesConfig()
+        vectorized = Suggester(vocab, config, edit_score_engine=VectorizedScorer())
+        scalar = Suggester(vocab, config, edit_score_engine=get_edit_score)
+        for fragment in ["a", "ab", "Abc", "dab"]:
+            self.assertEqual(
+                vectorized.get_prefix_suggestions(fragment),
+                scalar.get_prefix_suggestions(fragment),
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
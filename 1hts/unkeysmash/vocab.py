@@ -1,51 +1,461 @@
 import re, json
+import mmap
+import os
+import struct
+import sys
 import urllib.parse
+from array import array
+from collections import Counter
 
 
 def sortdict(d):
     return {key: value for key, value in sorted(d.items(), key=lambda item: item[1])}
 
 
+# Binary vocab files hold the vocab's words and its lowercase word
+# frequencies as two sorted string tables, so a vocab can be mapped in and
+# binary searched without building a set and dict of every word:
+#
+#   header: magic, word count, frequency count, total samples, max samples
+#   u32 word offsets (word count + 1)
+#   u32 frequency word offsets (frequency count + 1)
+#   u32 frequencies (frequency count)
+#   word blob, frequency word blob (utf-8, sorted)
+#
+# Integers are little endian, and offsets are relative to their blob.
+# utf-8 bytes sort in the same order as the strings they encode, so the
+# blobs can be compared directly while searching.
+
+BINARY_MAGIC = b"1htsvoc1"
+
+# how many learn_word calls Vocab.learned holds on to
+LEARNED_LOG_SIZE = 2000
+BINARY_HEADER = struct.Struct("<8sIIQQ")
+
+
+def _u32_array(values):
+    arr = array("I", values)
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _string_table(strings):
+    blob = bytearray()
+    offsets = [0]
+    for string in strings:
+        blob += string.encode("utf-8")
+        offsets.append(len(blob))
+    return offsets, bytes(blob)
+
+
+class VocabFile:
+    """
+    A binary vocab file mapped into memory. Pickles as its path, and is
+    mapped again when unpickled, as long as the file at the path is still
+    the one that was mapped. Once it has been replaced, by collect_corpus
+    rebuilding it say, the mapped bytes are pickled instead.
+    """
+
+    def __init__(self, path):
+        self._open(path)
+
+    def _open(self, path):
+        self.path = path
+        with open(path, "rb") as vocab_file:
+            self.buf = mmap.mmap(vocab_file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.file_id = _file_id(os.fstat(vocab_file.fileno()))
+        self._parse()
+
+    def _parse(self):
+        (
+            magic,
+            self.word_count,
+            self.freq_count,
+            self.total_sample_ct,
+            self.max_sample_ct,
+        ) = BINARY_HEADER.unpack_from(self.buf)
+        if magic != BINARY_MAGIC:
+            raise ValueError("%s is not a binary vocab file" % self.path)
+
+        arrays_len = 4 * (self.word_count + 1 + 2 * self.freq_count + 1)
+        arrays = memoryview(self.buf)[
+            BINARY_HEADER.size : BINARY_HEADER.size + arrays_len
+        ]
+        if sys.byteorder == "big":
+            arrays = array("I", arrays)
+            arrays.byteswap()
+        else:
+            arrays = arrays.cast("I")
+        self.word_offsets = arrays[: self.word_count + 1]
+        freq_start = self.word_count + 1
+        self.freq_offsets = arrays[freq_start : freq_start + self.freq_count + 1]
+        self.freqs = arrays[freq_start + self.freq_count + 1 :]
+        self.words_start = BINARY_HEADER.size + arrays_len
+        self.freq_words_start = self.words_start + self.word_offsets[-1]
+
+    def _is_mapped_file(self):
+        try:
+            return _file_id(os.stat(self.path)) == self.file_id
+        except OSError:
+            return False
+
+    def __getstate__(self):
+        if self.file_id is not None and self._is_mapped_file():
+            return {"path": self.path, "file_id": self.file_id}
+        return {"path": self.path, "data": bytes(self.buf)}
+
+    def __setstate__(self, state):
+        if "data" in state:
+            self.path = state["path"]
+            self.buf = state["data"]
+            self.file_id = None
+            self._parse()
+            return
+        self._open(state["path"])
+        if self.file_id != state["file_id"]:
+            raise ValueError("%s changed since it was pickled" % state["path"])
+
+
+def _file_id(stat):
+    # enough to tell a file apart from one written over it or moved into
+    # its place
+    return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+class _MappedStrings:
+    # a sorted string table in a VocabFile
+
+    def __init__(self, vocab_file, offsets, blob_start):
+        self._vocab_file = vocab_file
+        self._offsets = offsets
+        self._blob_start = blob_start
+
+    def __len__(self):
+        return len(getattr(self._vocab_file, self._offsets)) - 1
+
+    def _key(self, idx):
+        offsets = getattr(self._vocab_file, self._offsets)
+        start = getattr(self._vocab_file, self._blob_start)
+        return self._vocab_file.buf[start + offsets[idx] : start + offsets[idx + 1]]
+
+    def __getitem__(self, idx):
+        return self._key(idx).decode("utf-8")
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def index(self, word):
+        """
+        Binary search for word, returning its index or -1
+        """
+        key = word.encode("utf-8")
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self) and self._key(lo) == key:
+            return lo
+        return -1
+
+    def __contains__(self, word):
+        return self.index(word) != -1
+
+
+class _MappedWordFreq:
+    # read-only dict view of the word frequencies in a VocabFile
+
+    def __init__(self, vocab_file):
+        self._vocab_file = vocab_file
+        self._words = _MappedStrings(vocab_file, "freq_offsets", "freq_words_start")
+
+    def __len__(self):
+        return len(self._words)
+
+    def __getitem__(self, word):
+        idx = self._words.index(word)
+        if idx == -1:
+            raise KeyError(word)
+        return self._vocab_file.freqs[idx]
+
+    def __contains__(self, word):
+        return word in self._words
+
+    def get(self, word, default=None):
+        idx = self._words.index(word)
+        return default if idx == -1 else self._vocab_file.freqs[idx]
+
+    def __iter__(self):
+        return iter(self._words)
+
+    def keys(self):
+        return iter(self._words)
+
+    def values(self):
+        return iter(self._vocab_file.freqs)
+
+    def items(self):
+        return zip(self._words, self._vocab_file.freqs)
+
+
+# markdown noise removed before splitting into words. None of these can
+# match across whitespace, so text can be tokenized a line at a time.
+_DATA_URI = re.compile(r"\[data:[^]\s]+\]")
+_LINK_TARGET = re.compile(r"\]\([^)\s]+\)")
+_BARE_LINK = re.compile(r"http[^\s]+\)\]")
+# runs of characters between whitespace and punctuation. Punctuation is
+# split off into single character tokens, which are too short to keep.
+_WORD = re.compile(r"[^\s\\\"\[\]\(\)\*_`.,\-/%:&=?~+$!@]+")
+_DIGIT = re.compile(r"\d")
+
+
+def iter_md_words(lines):
+    """
+    Yield the words worth keeping from markdown text, given as lines or any
+    other pieces split at whitespace, like an open file
+    """
+    for line in lines:
+        line = _BARE_LINK.sub("", _LINK_TARGET.sub("", _DATA_URI.sub("", line)))
+        for word in _WORD.findall(line):
+            if len(word) >= 3 and _DIGIT.search(word) is None:
+                yield word
+
+
+def count_md_file(md_file, counts=None):
+    """
+    Count the words in an open markdown file by their spelling in it,
+    adding to counts if given. Reads the file a line at a time.
+    """
+    if counts is None:
+        counts = Counter()
+    counts.update(iter_md_words(md_file))
+    return counts
+
+
+def count_md_str(md_str, counts=None):
+    """
+    Count the words in a markdown string by their spelling in it, adding to
+    counts if given
+    """
+    return count_md_file((md_str,), counts)
+
+
+class FrequencyTable:
+    """
+    The vocab's words in canonical (lowercase) form, with each one's
+    frequency relative to the most frequent word worked out up front.
+
+    words is the canonical words, sorted apart from any learned after the
+    table was built, and variants maps every spelling of a word in the
+    vocab, the canonical one included, to its index in words. scores are
+    relative to the most frequent word when the table was built, and
+    scale brings them up to date with words learned since.
+
+    Callers going through many words look each one up once with index,
+    then read words[idx] and frequency_at(idx).
+    """
+
+    def __init__(self, words, wordfreq):
+        self.words = sorted(wordfreq.keys())
+        self.base_sample_ct = max(wordfreq.values(), default=1)
+        self.scores = array(
+            "d", (wordfreq[word] / self.base_sample_ct for word in self.words)
+        )
+        self.scale = 1.0
+        self.variants = {word: idx for idx, word in enumerate(self.words)}
+        for word in words:
+            if word not in self.variants:
+                idx = self.variants.get(word.lower())
+                if idx is not None:
+                    self.variants[word] = idx
+
+    def learn(self, word, word_lower, sample_ct, max_sample_ct):
+        """
+        Update the table for word's canonical form now having sample_ct
+        samples, and the most frequent word max_sample_ct
+        """
+        idx = self.variants.get(word_lower)
+        if idx is None:
+            idx = len(self.words)
+            self.words.append(word_lower)
+            self.scores.append(0)
+            self.variants[word_lower] = idx
+        if word not in self.variants:
+            self.variants[word] = idx
+        self.scores[idx] = sample_ct / self.base_sample_ct
+        self.scale = self.base_sample_ct / max_sample_ct
+
+    def index(self, word):
+        return self.variants[word]
+
+    def frequency_at(self, idx):
+        return self.scores[idx] * self.scale
+
+    def canonical(self, word):
+        return self.words[self.variants[word]]
+
+    def relative_frequency(self, word):
+        return self.scores[self.variants[word]] * self.scale
+
+
+class _MappedFrequencyTable:
+    # FrequencyTable over the sorted frequency table of a VocabFile, so
+    # ranking words in a mapped vocab doesn't decode all of them. Mapped
+    # vocabs are copied out before they change, so it never learns words.
+
+    def __init__(self, vocab_file):
+        self.words = _MappedStrings(vocab_file, "freq_offsets", "freq_words_start")
+        self.freqs = vocab_file.freqs
+        self.max_sample_ct = max(1, vocab_file.max_sample_ct)
+
+    def index(self, word):
+        # every spelling of a word is counted under its lowercase form
+        idx = self.words.index(word.lower())
+        if idx == -1:
+            raise KeyError(word)
+        return idx
+
+    def frequency_at(self, idx):
+        return self.freqs[idx] / self.max_sample_ct
+
+    def canonical(self, word):
+        return self.words[self.index(word)]
+
+    def relative_frequency(self, word):
+        return self.frequency_at(self.index(word))
+
+
 class Vocab:
     def __init__(self):
         self._words = set()
         self._wordfreq = dict()
         self._total_sample_ct = 0
+        self._max_sample_ct = 0
+        self._avg_sample_ct = 0
+        self._substring_index = None
+        self._frequency_table = None
+        # bumped whenever the words or frequencies change, apart from words
+        # learned one at a time with learn_word, which are logged in learned
+        self.generation = 0
+        # (word, count) for the last LEARNED_LOG_SIZE or so learn_word
+        # calls, starting from call number learned_start, so users of the
+        # vocab can catch up on just the words learned since they last
+        # looked
+        self.learned = []
+        self.learned_start = 0
+
+    def __getstate__(self):
+        # the substring index is derived from _words, so leave it out of
+        # pickles (e.g. vocabs sent to batch_scoring workers)
+        state = dict(self.__dict__)
+        state["_substring_index"] = None
+        state["_frequency_table"] = None
+        return state
+
+    def _unmap(self):
+        # words can't be added to a mapped vocab in place, so copy it out
+        # the first time it changes
+        if isinstance(self._words, _MappedStrings):
+            self._words = set(self._words)
+            self._wordfreq = dict(self._wordfreq.items())
+            self._frequency_table = None
 
     def consume_md_str(self, md_str):
-        md_clean_words = re.split(
-            "\s+",
-            re.sub(
-                r"([\\\"\[\]\(\)\*_`.,\-/%:&=?~+$!@])",
-                " \g<1> ",
-                re.sub(
-                    r"http[^\s]+\)\]",
-                    "",
-                    re.sub(
-                        r"\]\([^)\s]+\)",
-                        "",
-                        re.sub(r"\[data:[^]\s]+\]", "", md_str),
-                    ),
-                ),
-            ),
-        )
-        for word in md_clean_words:
-            if not re.match(r".*\d", word) and len(word) >= 3:
-                self._words.add(word)
-                word_lower = word.lower()
-                if word_lower not in self._wordfreq:
-                    self._wordfreq[word_lower] = 1
-                else:
-                    self._wordfreq[word_lower] = self._wordfreq[word_lower] + 1
+        self.consume_counts(count_md_str(md_str))
+
+    def consume_counts(self, counts):
+        """
+        Add words counted by count_md_str, updating the frequency stats once
+        for the whole batch
+        """
+        self._unmap()
+        for word, count in counts.items():
+            self._words.add(word)
+            if self._substring_index is not None:
+                self._substring_index.add(word)
+            word_lower = word.lower()
+            if word_lower == word:
+                # share the string between _words and _wordfreq
+                word_lower = word
+            if word_lower not in self._wordfreq:
+                self._wordfreq[word_lower] = count
             else:
-                print("omitting", word, "as noise")
+                self._wordfreq[word_lower] = self._wordfreq[word_lower] + count
+
+        self._update_frequencies()
+        self.generation += 1
+
+    def learn_word(self, word, count=1):
+        """
+        Add count samples of word, updating the frequency stats and table in
+        place rather than recomputing them
+        """
+        self._unmap()
+        self._words.add(word)
+        if self._substring_index is not None:
+            self._substring_index.add(word)
+        word_lower = word.lower()
+        if word_lower == word:
+            word_lower = word
+        sample_ct = self._wordfreq.get(word_lower, 0) + count
+        self._wordfreq[word_lower] = sample_ct
+        self._total_sample_ct += count
+        self._max_sample_ct = max(self._max_sample_ct, sample_ct)
+        self._avg_sample_ct = self._total_sample_ct / len(self._wordfreq)
+        if self._frequency_table is not None:
+            self._frequency_table.learn(
+                word, word_lower, sample_ct, self._max_sample_ct
+            )
+        self.learned.append((word, count))
+        if len(self.learned) > LEARNED_LOG_SIZE:
+            trimmed_ct = len(self.learned) // 2
+            del self.learned[:trimmed_ct]
+            self.learned_start += trimmed_ct
 
+    def learned_ct(self):
+        """
+        Get how many times learn_word has been called
+        """
+        return self.learned_start + len(self.learned)
+
+    def learned_since(self, learned_ct):
+        """
+        Get the (word, count) of each learn_word call after the first
+        learned_ct, or None if the log no longer goes back that far
+        """
+        if learned_ct < self.learned_start:
+            return None
+        return self.learned[learned_ct - self.learned_start :]
+
+    def prune(self, min_count=1, max_size=None):
+        """
+        Drop the words seen fewer than min_count times, then all but the
+        max_size most frequent, counting spellings of a word together
+        """
+        self._unmap()
+        kept = [word for word, count in self._wordfreq.items() if count >= min_count]
+        if max_size is not None and len(kept) > max_size:
+            kept = sorted(kept, key=lambda word: (-self._wordfreq[word], word))
+            kept = set(kept[:max_size])
+        else:
+            kept = set(kept)
+        self._wordfreq = {
+            word: count for word, count in self._wordfreq.items() if word in kept
+        }
+        self._words = set(word for word in self._words if word.lower() in kept)
+        self._substring_index = None
         self._update_frequencies()
+        self.generation += 1
 
     def _update_frequencies(self):
+        self._frequency_table = None
         self._total_sample_ct = sum(self._wordfreq.values())
-        self._max_sample_ct = max(self._wordfreq.values())
-        self._avg_sample_ct = self._total_sample_ct / len(self._wordfreq)
+        self._max_sample_ct = max(self._wordfreq.values(), default=0)
+        self._avg_sample_ct = self._total_sample_ct / max(1, len(self._wordfreq))
 
     def dumps(self):
         return json.dumps(
@@ -60,12 +470,97 @@ class Vocab:
         v = Vocab()
         dumped = json.loads(dumped_str)
         v._wordfreq = dumped["_wordfreq"]
-        v._words = set(dumped["_words"])
+        # share strings between _words and _wordfreq where they're equal
+        freq_words = {word: word for word in v._wordfreq}
+        v._words = set(freq_words.get(word, word) for word in dumped["_words"])
         v._update_frequencies()
         return v
 
+    def dumps_binary(self):
+        """
+        Get the vocab in the binary vocab format
+        """
+        word_offsets, words_blob = _string_table(sorted(self._words))
+        freq_words = sorted(self._wordfreq.keys())
+        freq_offsets, freq_words_blob = _string_table(freq_words)
+        freqs = [self._wordfreq[word] for word in freq_words]
+        return b"".join(
+            [
+                BINARY_HEADER.pack(
+                    BINARY_MAGIC,
+                    len(word_offsets) - 1,
+                    len(freq_words),
+                    sum(freqs),
+                    max(freqs, default=0),
+                ),
+                _u32_array(word_offsets),
+                _u32_array(freq_offsets),
+                _u32_array(freqs),
+                words_blob,
+                freq_words_blob,
+            ]
+        )
+
+    def write_binary(self, path):
+        """
+        Write the vocab to path in the binary vocab format. Written to a
+        temporary file and moved into place, since a running unkeysmash
+        may have the old file mapped, and would crash if it were
+        truncated underneath it.
+        """
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as vocab_file:
+            vocab_file.write(self.dumps_binary())
+        os.replace(tmp_path, path)
+
+    def load_binary(path):
+        """
+        Map in a binary vocab file. The words and frequencies are searched
+        in the mapped file rather than loaded, until more words are consumed.
+        """
+        v = Vocab()
+        vocab_file = VocabFile(path)
+        v._words = _MappedStrings(vocab_file, "word_offsets", "words_start")
+        v._wordfreq = _MappedWordFreq(vocab_file)
+        v._total_sample_ct = vocab_file.total_sample_ct
+        v._max_sample_ct = vocab_file.max_sample_ct
+        if vocab_file.freq_count != 0:
+            v._avg_sample_ct = vocab_file.total_sample_ct / vocab_file.freq_count
+        return v
+
     def iterwords(self):
         return iter(self._words)
 
+    def substring_index(self):
+        """
+        Get a TrigramIndex over the vocab's words, built on first use and
+        kept up to date as more words are consumed
+        """
+        if self._substring_index is None:
+            # imported here so collect_corpus can still run vocab.py as a
+            # plain module outside of the package
+            from .vocab_index import TrigramIndex
+
+            self._substring_index = TrigramIndex(self._words)
+        return self._substring_index
+
+    def frequency_table(self):
+        """
+        Get the vocab's FrequencyTable, rebuilt on first use after the
+        frequencies change. Mapped vocabs read it from the mapped file.
+        """
+        if self._frequency_table is None:
+            if isinstance(self._wordfreq, _MappedWordFreq):
+                self._frequency_table = _MappedFrequencyTable(
+                    self._wordfreq._vocab_file
+                )
+            else:
+                self._frequency_table = FrequencyTable(self._words, self._wordfreq)
+        return self._frequency_table
+
     def relative_frequency(self, word):
-        return self._wordfreq[word] / self._max_sample_ct
+        """
+        Get word's frequency relative to the most frequent word, for any
+        of the vocab's spellings of it
+        """
+        return self.frequency_table().relative_frequency(word)
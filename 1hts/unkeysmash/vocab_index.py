@@ -0,0 +1,396 @@
+import sys
+import json
+import hashlib
+from array import array
+from bisect import bisect_left
+from .bitparallel import (
+    bitparallel_distance,
+    bitparallel_prefix_distance,
+    char_masks,
+)
+
+
+class LinearScanIndex:
+    """
+    Candidate lookup by scanning every word in the vocab for the fragment
+    """
+
+    def __init__(self, vocab):
+        self.vocab = vocab
+
+    def candidates(self, fragment):
+        return [w for w in self.vocab.iterwords() if fragment in w]
+
+    def narrow(self, candidates, fragment):
+        """
+        Get the candidates for fragment from the candidates of a prefix of it
+        """
+        return [w for w in candidates if fragment in w]
+
+
+def prefix_upper_bound(prefix):
+    """
+    Get the smallest string greater than every string starting with prefix,
+    or None if there is no such string
+    """
+    prefix = prefix.rstrip(chr(sys.maxunicode))
+    if len(prefix) == 0:
+        return None
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class PrefixIndex:
+    """
+    Candidate lookup for words starting with a fragment, by bisecting a
+    sorted array of the vocab's words
+    """
+
+    def __init__(self, vocab):
+        self.words = sorted(vocab.iterwords())
+
+    def candidates(self, fragment):
+        if len(fragment) == 0:
+            return list(self.words)
+        start = bisect_left(self.words, fragment)
+        upper_bound = prefix_upper_bound(fragment)
+        if upper_bound is None:
+            return self.words[start:]
+        end = bisect_left(self.words, upper_bound, lo=start)
+        return self.words[start:end]
+
+    def narrow(self, candidates, fragment):
+        return [w for w in candidates if w.startswith(fragment)]
+
+
+def word_grams(word, max_gram_len):
+    grams = set()
+    for gram_len in range(1, max_gram_len + 1):
+        for i in range(len(word) - gram_len + 1):
+            grams.add(word[i : i + gram_len])
+    return grams
+
+
+class TrigramIndex:
+    """
+    Candidate lookup for words containing a fragment anywhere, like the
+    linear scan.
+
+    Keeps a posting list of word ids for every 1, 2 and 3 character gram.
+    A lookup verifies only the words in the shortest posting list among
+    the fragment's grams, rather than every word in the vocab.
+    """
+
+    max_gram_len = 3
+
+    def __init__(self, words=()):
+        self.words = []
+        self.word_ids = dict()
+        self.postings = dict()
+        for word in words:
+            self.add(word)
+
+    def add(self, word):
+        if word in self.word_ids:
+            return
+        word_id = len(self.words)
+        self.words.append(word)
+        self.word_ids[word] = word_id
+        for gram in word_grams(word, self.max_gram_len):
+            posting = self.postings.get(gram)
+            if posting is None:
+                posting = array("I")
+                self.postings[gram] = posting
+            posting.append(word_id)
+
+    def candidates(self, fragment):
+        if len(fragment) == 0:
+            return list(self.words)
+
+        gram_len = min(len(fragment), self.max_gram_len)
+        shortest = None
+        for i in range(len(fragment) - gram_len + 1):
+            posting = self.postings.get(fragment[i : i + gram_len])
+            if posting is None:
+                return []
+            if shortest is None or len(posting) < len(shortest):
+                shortest = posting
+
+        words = self.words
+        if gram_len == len(fragment):
+            return [words[word_id] for word_id in shortest]
+        return [words[word_id] for word_id in shortest if fragment in words[word_id]]
+
+    def narrow(self, candidates, fragment):
+        return [w for w in candidates if fragment in w]
+
+
+class TieredIndex:
+    """
+    Substring candidate lookup that tries the hot_size most frequent words
+    first, and only searches the rest of the vocab when fewer than min_hot
+    of them match.
+
+    The cold tier is the vocab's own substring_index, so words the vocab
+    learns later are still found there. The hot tier is picked when the
+    index is built.
+
+    narrow must only be given this index's own candidates, as it tells
+    whether the cold tier was searched by whether any of them are cold.
+    """
+
+    def __init__(self, vocab, hot_size=5000, min_hot=5):
+        frequency_table = vocab.frequency_table()
+        words = sorted(
+            vocab.iterwords(),
+            key=lambda w: (-frequency_table.relative_frequency(w), w),
+        )
+        self.hot_words = set(words[:hot_size])
+        self.hot = TrigramIndex(words[:hot_size])
+        self.full = vocab.substring_index()
+        self.min_hot = min_hot
+
+    def _cold_candidates(self, fragment):
+        hot_words = self.hot_words
+        return [w for w in self.full.candidates(fragment) if w not in hot_words]
+
+    def candidates(self, fragment):
+        candidates = self.hot.candidates(fragment)
+        if len(candidates) >= self.min_hot:
+            return candidates
+        return candidates + self._cold_candidates(fragment)
+
+    def narrow(self, candidates, fragment):
+        hot_words = self.hot_words
+        narrowed = self.full.narrow(candidates, fragment)
+        hot = [w for w in narrowed if w in hot_words]
+        if len(hot) >= self.min_hot:
+            return hot
+        if any(w not in hot_words for w in candidates):
+            # the cold tier was already searched for the shorter fragment,
+            # and its matches for this one are among them
+            return narrowed
+        return hot + self._cold_candidates(fragment)
+
+
+def deletions(word, max_deletes):
+    """
+    Get every string formed by deleting up to max_deletes characters
+    from word, including word itself
+    """
+    results = set([word])
+    frontier = [word]
+    for _ in range(max_deletes):
+        next_frontier = []
+        for w in frontier:
+            for i in range(len(w)):
+                deleted = w[:i] + w[i + 1 :]
+                if deleted not in results:
+                    results.add(deleted)
+                    next_frontier.append(deleted)
+        frontier = next_frontier
+    return results
+
+
+def vocab_hash(words):
+    return hashlib.sha1("\n".join(sorted(words)).encode("utf-8")).hexdigest()
+
+
+class DeletionIndex:
+    """
+    Typo tolerant candidate lookup, in the style of SymSpell.
+
+    Every prefix of every word, up to prefix_len characters, is indexed
+    under each string reachable from it by deleting up to max_distance
+    characters. A fragment within max_distance of some prefix of a word
+    shares one of those deletions, so a lookup only has to generate the
+    fragment's own deletions and verify the words they point to.
+    """
+
+    def __init__(self, words=(), max_distance=2, prefix_len=7):
+        self.max_distance = max_distance
+        self.prefix_len = prefix_len
+        self.words = []
+        self._word_set = set()
+        self.deletes = dict()
+        for word in words:
+            self.add(word)
+
+    def add(self, word):
+        """
+        Index word, if it isn't already
+        """
+        if word in self._word_set:
+            return
+        word_id = len(self.words)
+        self.words.append(word)
+        self._word_set.add(word)
+        prefix = word.lower()[: self.prefix_len]
+        word_deletes = set()
+        for l in range(1, len(prefix) + 1):
+            word_deletes |= deletions(prefix[:l], self.max_distance)
+        # no fragment allows enough edits to look up the empty string
+        word_deletes.discard("")
+        for deleted in word_deletes:
+            posting = self.deletes.get(deleted)
+            if posting is None:
+                posting = []
+                self.deletes[deleted] = posting
+            posting.append(word_id)
+
+    def max_edits(self, fragment):
+        # allowing as many edits as a short fragment has characters
+        # would match every word in the vocab
+        return min(self.max_distance, (len(fragment) - 1) // 2)
+
+    def candidates(self, fragment):
+        """
+        Get every word with a prefix within max_edits(fragment) of fragment
+        """
+        if len(fragment) == 0:
+            return []
+        fragment = fragment.lower()[: self.prefix_len]
+        max_edits = self.max_edits(fragment)
+
+        word_ids = set()
+        for deleted in deletions(fragment, max_edits):
+            posting = self.deletes.get(deleted)
+            if posting is not None:
+                word_ids.update(posting)
+
+        masks = char_masks(fragment)
+        source_len = len(fragment) + max_edits
+        results = []
+        for word_id in sorted(word_ids):
+            word = self.words[word_id]
+            distance = bitparallel_prefix_distance(
+                masks, len(fragment), word.lower()[:source_len]
+            )
+            if distance <= max_edits:
+                results.append(word)
+        return results
+
+    def dumps(self):
+        return json.dumps(
+            {
+                "max_distance": self.max_distance,
+                "prefix_len": self.prefix_len,
+                "vocab_hash": vocab_hash(self.words),
+                "words": self.words,
+                "deletes": self.deletes,
+            }
+        )
+
+    @staticmethod
+    def loads(dumped_str):
+        return DeletionIndex._from_dumped(json.loads(dumped_str))
+
+    @staticmethod
+    def _from_dumped(dumped):
+        index = DeletionIndex(
+            max_distance=dumped["max_distance"], prefix_len=dumped["prefix_len"]
+        )
+        index.words = dumped["words"]
+        index._word_set = set(index.words)
+        index.deletes = dumped["deletes"]
+        return index
+
+    @staticmethod
+    def load_or_build(path, vocab, max_distance=2, prefix_len=7):
+        """
+        Load the index persisted at path, rebuilding it and writing it
+        back if it is missing or was built from a different vocab
+        """
+        words = list(vocab.iterwords())
+        try:
+            with open(path, "r") as index_file:
+                dumped = json.loads(index_file.read())
+            if (
+                dumped["vocab_hash"] == vocab_hash(words)
+                and dumped["max_distance"] == max_distance
+                and dumped["prefix_len"] == prefix_len
+            ):
+                return DeletionIndex._from_dumped(dumped)
+        except (OSError, ValueError, KeyError):
+            pass
+
+        index = DeletionIndex(words, max_distance, prefix_len)
+        with open(path, "w") as index_file:
+            index_file.write(index.dumps())
+        return index
+
+
+class BKTreeNode:
+    def __init__(self, key, word):
+        self.key = key
+        self.words = [word]
+        self.children = dict()
+
+
+class BKTree:
+    """
+    Metric tree over the vocab's lowercased words, by levenshtein distance.
+
+    Children are keyed by their distance to the parent, so a query for
+    words within k of a word only descends into children whose distance
+    is within k of the query's distance to the parent.
+
+    visited counts how many nodes the last query compared against, with
+    total_visited and query_count accumulating over every query.
+    """
+
+    def __init__(self, words=()):
+        self.root = None
+        self.size = 0
+        self.visited = 0
+        self.total_visited = 0
+        self.query_count = 0
+        for word in words:
+            self.add(word)
+
+    def add(self, word):
+        key = word.lower()
+        if self.root is None:
+            self.root = BKTreeNode(key, word)
+            self.size += 1
+            return
+
+        masks = char_masks(key)
+        node = self.root
+        while True:
+            distance = bitparallel_distance(masks, len(key), node.key)
+            if distance == 0:
+                if word not in node.words:
+                    node.words.append(word)
+                return
+            child = node.children.get(distance)
+            if child is None:
+                node.children[distance] = BKTreeNode(key, word)
+                self.size += 1
+                return
+            node = child
+
+    def find(self, word, max_distance):
+        """
+        Get (distance, word) for every word within max_distance of word
+        """
+        self.visited = 0
+        self.query_count += 1
+        if self.root is None:
+            return []
+
+        key = word.lower()
+        masks = char_masks(key)
+        results = []
+        stack = [self.root]
+        while len(stack) != 0:
+            node = stack.pop()
+            self.visited += 1
+            distance = bitparallel_distance(masks, len(key), node.key)
+            if distance <= max_distance:
+                results.extend((distance, w) for w in node.words)
+            for child_distance, child in node.children.items():
+                if abs(child_distance - distance) <= max_distance:
+                    stack.append(child)
+
+        self.total_visited += self.visited
+        return results
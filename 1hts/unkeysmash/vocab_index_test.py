@@ -0,0 +1,225 @@
+import json
+import os
+import random
+import tempfile
+import unittest
+from .edit_sequences import EditSequencesConfig
+from .suggester import Suggester
+from .vocab import Vocab
+from .bitparallel import bitparallel_distance, char_masks
+from .vocab_index import (
+    BKTree,
+    DeletionIndex,
+    LinearScanIndex,
+    PrefixIndex,
+    TieredIndex,
+    TrigramIndex,
+)
+
+
+def make_vocab(words):
+    return Vocab.loads(
+        json.dumps(
+            {
+                "_words": words,
+                "_wordfreq": {w.lower(): i + 1 for i, w in enumerate(words)},
+            }
+        )
+    )
+
+
+def random_words(rng, n, alphabet="abcdeAB"):
+    return sorted(
+        set(
+            "".join(rng.choice(alphabet) for _ in range(rng.randint(3, 8)))
+            for _ in range(n)
+        )
+    )
+
+
+class VocabIndexTest(unittest.TestCase):
+    def test_prefix_index_matches_scan(self):
+        rng = random.Random(1)
+        vocab = make_vocab(random_words(rng, 500))
+        index = PrefixIndex(vocab)
+        for fragment in [
+            "",
+            "a",
+            "ab",
+            "abc",
+            "B",
+            "e",
+            "eee",
+            "z",
+            "￿",
+            chr(0x10FFFF),
+        ]:
+            self.assertEqual(
+                index.candidates(fragment),
+                sorted(w for w in vocab.iterwords() if w.startswith(fragment)),
+                fragment,
+            )
+
+    def test_prefix_suggestions_ranked_like_scan(self):
+        rng = random.Random(2)
+        vocab = make_vocab(random_words(rng, 200))
+        config = EditSequencesConfig()
+        indexed = Suggester(vocab, config, candidate_index=PrefixIndex(vocab))
+        for fragment in ["a", "ab", "cd", "Ba"]:
+            expected = sorted(
+                sorted(w for w in vocab.iterwords() if w.startswith(fragment)),
+                key=lambda w: indexed.prefix_match_distance(
+                    w.lower(), fragment.lower()
+                ),
+            )[0:5]
+            self.assertEqual(indexed.get_prefix_suggestions(fragment), expected)
+
+    def test_trigram_index_matches_scan(self):
+        rng = random.Random(3)
+        vocab = make_vocab(random_words(rng, 500))
+        index = TrigramIndex(vocab.iterwords())
+        scan = LinearScanIndex(vocab)
+        for fragment in ["", "a", "B", "ab", "bca", "abcd", "cdeab", "z", "abz"]:
+            self.assertEqual(
+                sorted(index.candidates(fragment)),
+                sorted(scan.candidates(fragment)),
+                fragment,
+            )
+
+    def test_vocab_substring_index_tracks_consumed_words(self):
+        vocab = make_vocab(["alpha", "beta"])
+        index = vocab.substring_index()
+        self.assertEqual(index.candidates("lph"), ["alpha"])
+        vocab.consume_md_str("gamma alphabet")
+        self.assertEqual(sorted(index.candidates("lph")), ["alpha", "alphabet"])
+        self.assertEqual(index.candidates("amm"), ["gamma"])
+
+    def test_tiered_index(self):
+        rng = random.Random(7)
+        vocab = make_vocab(random_words(rng, 500))
+        index = TieredIndex(vocab, hot_size=50, min_hot=5)
+        self.assertEqual(len(index.hot_words), 50)
+        self.assertLessEqual(
+            max(
+                vocab.relative_frequency(w)
+                for w in vocab.iterwords()
+                if w not in index.hot_words
+            ),
+            min(vocab.relative_frequency(w) for w in index.hot_words),
+        )
+        scan = LinearScanIndex(vocab)
+        for fragment in ["a", "ab", "abc", "abcd", "Ab", "eBa", "zz"]:
+            hot = [w for w in scan.candidates(fragment) if w in index.hot_words]
+            candidates = index.candidates(fragment)
+            if len(hot) >= 5:
+                self.assertEqual(sorted(candidates), sorted(hot), fragment)
+            else:
+                self.assertEqual(
+                    sorted(candidates), sorted(scan.candidates(fragment)), fragment
+                )
+
+    def test_tiered_index_narrow(self):
+        rng = random.Random(8)
+        vocab = make_vocab(random_words(rng, 500))
+        index = TieredIndex(vocab, hot_size=40, min_hot=5)
+        for word in random_words(rng, 30):
+            candidates = index.candidates(word[:1])
+            for end in range(2, len(word) + 1):
+                candidates = index.narrow(candidates, word[:end])
+                self.assertEqual(
+                    sorted(candidates), sorted(index.candidates(word[:end])), word
+                )
+
+    def test_tiered_index_finds_learned_words(self):
+        vocab = make_vocab(["alpha", "beta", "gamma"])
+        index = TieredIndex(vocab, hot_size=2)
+        vocab.learn_word("alphabet")
+        self.assertEqual(sorted(index.candidates("lph")), ["alpha", "alphabet"])
+
+    def test_deletion_index_matches_scan(self):
+        rng = random.Random(4)
+        words = random_words(rng, 300)
+        index = DeletionIndex(words, max_distance=2, prefix_len=7)
+        for fragment in ["a", "ab", "abc", "bda", "cabe", "aBcde", "eeddcc", "zzzzz"]:
+            max_edits = index.max_edits(fragment)
+            lower = fragment.lower()
+            expected = [
+                w
+                for w in words
+                if min(
+                    bitparallel_distance(char_masks(w.lower()[:l]), l, lower)
+                    for l in range(len(w) + 1)
+                )
+                <= max_edits
+            ]
+            self.assertEqual(index.candidates(fragment), expected, fragment)
+
+    def test_deletion_index_add(self):
+        rng = random.Random(9)
+        words = random_words(rng, 200)
+        added = DeletionIndex(words[:100])
+        for word in words[100:] + words[:10]:
+            added.add(word)
+        built = DeletionIndex(words)
+        self.assertEqual(added.words, built.words)
+        for fragment in ["a", "ab", "abc", "bda", "cabe", "aBcde"]:
+            self.assertEqual(added.candidates(fragment), built.candidates(fragment))
+
+    def test_deletion_index_load_or_build(self):
+        vocab = make_vocab(["keyboard", "keysmash", "layer"])
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "vocab.deletes.json")
+            built = DeletionIndex.load_or_build(path, vocab)
+            self.assertEqual(sorted(built.candidates("kwyb")), ["keyboard"])
+            loaded = DeletionIndex.load_or_build(path, vocab)
+            self.assertEqual(loaded.deletes, built.deletes)
+
+            rebuilt = DeletionIndex.load_or_build(path, make_vocab(["layer"]))
+            self.assertEqual(rebuilt.words, ["layer"])
+
+    def test_prefix_suggestions_include_typos(self):
+        vocab = make_vocab(["keyboard", "keysmash", "layer"])
+        suggester = Suggester(
+            vocab,
+            EditSequencesConfig(),
+            candidate_index=vocab.substring_index(),
+            typo_index=DeletionIndex(vocab.iterwords()),
+        )
+        self.assertEqual(suggester.get_prefix_suggestions("kwyb"), ["keyboard"])
+
+    def test_bk_tree_matches_scan(self):
+        rng = random.Random(5)
+        words = random_words(rng, 1000)
+        tree = BKTree(words)
+        for query in ["abcde", "AAB", "edcba", "bbbbbb"]:
+            for k in range(3):
+                expected = []
+                for w in words:
+                    d = bitparallel_distance(
+                        char_masks(query.lower()), len(query), w.lower()
+                    )
+                    if d <= k:
+                        expected.append((d, w))
+                self.assertEqual(sorted(tree.find(query, k)), sorted(expected))
+                self.assertLessEqual(tree.visited, tree.size)
+        self.assertEqual(tree.query_count, 12)
+
+    def test_bk_tree_prunes(self):
+        rng = random.Random(6)
+        tree = BKTree(random_words(rng, 2000, alphabet="abcdefghij"))
+        tree.find("abcdef", 1)
+        self.assertLess(tree.visited, tree.size / 2)
+
+    def test_full_word_corrections(self):
+        vocab = make_vocab(["keyboard", "keysmash", "layer", "Layers"])
+        suggester = Suggester(vocab, EditSequencesConfig())
+        self.assertEqual(
+            suggester.get_full_word_corrections("keybaord", 2), ["keyboard"]
+        )
+        self.assertEqual(
+            sorted(suggester.get_full_word_corrections("layr", 2)), ["Layers", "layer"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
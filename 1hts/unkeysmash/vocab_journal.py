@@ -0,0 +1,88 @@
+import json
+import os
+from collections import Counter
+from .vocab import iter_md_words
+
+
+class VocabJournal:
+    """
+    Append-only log of the words learned while typing, which are folded
+    into the vocab as they come in and compacted into a file of learned
+    word counts every compact_every words.
+
+    Each line of the journal is one learned word. Opening a journal merges
+    the learned counts and then replays the journal into the vocab, so
+    learned words carry over between runs. They are kept apart from the
+    vocab file, so collect_corpus can rebuild that from the corpus without
+    losing them.
+
+    Compaction writes the learned counts before emptying the journal, so if
+    it is interrupted in between, the words in the journal are counted
+    twice rather than lost.
+    """
+
+    def __init__(self, vocab, learned_path, journal_path, compact_every=500):
+        self.vocab = vocab
+        self.learned_path = learned_path
+        self.journal_path = journal_path
+        self.compact_every = compact_every
+        # every word learned, by the spelling it was learned with
+        self.learned_counts = self._load_learned()
+        if len(self.learned_counts) != 0:
+            vocab.consume_counts(self.learned_counts)
+        # words learned since the learned counts were last written
+        self.pending_ct = self._replay()
+        self._journal_file = open(journal_path, "a")
+
+    def _load_learned(self):
+        try:
+            with open(self.learned_path, "r") as learned_file:
+                return Counter(json.load(learned_file))
+        except FileNotFoundError:
+            return Counter()
+
+    def _replay(self):
+        try:
+            journal_file = open(self.journal_path, "r")
+        except FileNotFoundError:
+            return 0
+        replayed_ct = 0
+        with journal_file:
+            for line in journal_file:
+                word = line.rstrip("\n")
+                if len(word) != 0:
+                    self.vocab.learn_word(word)
+                    self.learned_counts[word] += 1
+                    replayed_ct += 1
+        return replayed_ct
+
+    def learn_word(self, word):
+        """
+        Learn a word the user typed or picked, keeping only what the
+        corpus tokenizer would
+        """
+        for learned in iter_md_words([word]):
+            self.vocab.learn_word(learned)
+            self.learned_counts[learned] += 1
+            self._journal_file.write(learned + "\n")
+            self.pending_ct += 1
+        self._journal_file.flush()
+        if self.pending_ct >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        """
+        Write the learned counts out to the learned file and empty the
+        journal
+        """
+        tmp_path = self.learned_path + ".tmp"
+        with open(tmp_path, "w") as learned_file:
+            json.dump(self.learned_counts, learned_file)
+        os.replace(tmp_path, self.learned_path)
+
+        self._journal_file.close()
+        self._journal_file = open(self.journal_path, "w")
+        self.pending_ct = 0
+
+    def close(self):
+        self._journal_file.close()
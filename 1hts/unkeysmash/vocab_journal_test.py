@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+from .vocab import Vocab
+from .vocab_index_test import make_vocab
+from .vocab_journal import VocabJournal
+
+
+class VocabJournalTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.vocab_path = os.path.join(self.tmpdir.name, "vocab.bin")
+        self.learned_path = os.path.join(self.tmpdir.name, "vocab.learned.json")
+        self.journal_path = os.path.join(self.tmpdir.name, "vocab.journal")
+        with open(self.vocab_path, "wb") as vocab_file:
+            vocab_file.write(make_vocab(["alpha", "beta"]).dumps_binary())
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def open_journal(self, compact_every=500):
+        vocab = Vocab.load_binary(self.vocab_path)
+        journal = VocabJournal(
+            vocab, self.learned_path, self.journal_path, compact_every
+        )
+        self.addCleanup(journal.close)
+        return vocab, journal
+
+    def test_replays_journal(self):
+        vocab, journal = self.open_journal()
+        for word in ["Gamma", "gamma,", "x1y", "ab", "(beta)"]:
+            journal.learn_word(word)
+        self.assertEqual(vocab._wordfreq["gamma"], 2)
+        self.assertEqual(vocab._wordfreq["beta"], 3)
+        self.assertNotIn("x1y", vocab._wordfreq)
+        self.assertEqual(journal.pending_ct, 3)
+        journal.close()
+
+        reopened, reopened_journal = self.open_journal()
+        self.assertEqual(reopened_journal.pending_ct, 3)
+        self.assertEqual(dict(reopened._wordfreq.items()), vocab._wordfreq)
+        self.assertEqual(set(reopened.iterwords()), set(vocab.iterwords()))
+
+    def test_compacts_into_learned_file(self):
+        vocab, journal = self.open_journal(compact_every=3)
+        for word in ["gamma", "Gamma", "delta", "beta"]:
+            journal.learn_word(word)
+        self.assertEqual(journal.pending_ct, 1)
+        with open(self.journal_path, "r") as journal_file:
+            self.assertEqual(journal_file.read(), "beta\n")
+        journal.close()
+
+        reopened, _ = self.open_journal()
+        self.assertEqual(dict(reopened._wordfreq.items()), vocab._wordfreq)
+        self.assertEqual(set(reopened.iterwords()), set(vocab.iterwords()))
+        # the vocab file is left to collect_corpus
+        original = Vocab.load_binary(self.vocab_path)
+        self.assertEqual(dict(original._wordfreq.items()), {"alpha": 1, "beta": 2})
+
+    def test_learned_words_survive_vocab_rebuild(self):
+        _, journal = self.open_journal(compact_every=2)
+        for word in ["gamma", "gamma", "beta"]:
+            journal.learn_word(word)
+        journal.close()
+
+        # as collect_corpus writes it, from the corpus alone
+        with open(self.vocab_path, "wb") as vocab_file:
+            vocab_file.write(make_vocab(["alpha", "beta", "epsilon"]).dumps_binary())
+        reopened, _ = self.open_journal()
+        self.assertEqual(reopened._wordfreq["gamma"], 2)
+        self.assertEqual(reopened._wordfreq["beta"], 3)
+        self.assertEqual(reopened._wordfreq["epsilon"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,263 @@
+import io
+import os
+import pickle
+import random
+import re
+import tempfile
+import unittest
+from collections import Counter
+from .vocab import (
+    LEARNED_LOG_SIZE,
+    FrequencyTable,
+    Vocab,
+    count_md_str,
+    iter_md_words,
+)
+from .vocab_index_test import make_vocab, random_words
+
+
+def reference_md_words(md_str):
+    # the nested substitutions consume_md_str used to tokenize with
+    md_clean_words = re.split(
+        r"\s+",
+        re.sub(
+            r"([\\\"\[\]\(\)\*_`.,\-/%:&=?~+$!@])",
+            r" \g<1> ",
+            re.sub(
+                r"http[^\s]+\)\]",
+                "",
+                re.sub(
+                    r"\]\([^)\s]+\)",
+                    "",
+                    re.sub(r"\[data:[^]\s]+\]", "", md_str),
+                ),
+            ),
+        ),
+    )
+    return [
+        word
+        for word in md_clean_words
+        if not re.match(r".*\d", word) and len(word) >= 3
+    ]
+
+
+class VocabTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "vocab.bin")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write_binary(self, vocab):
+        with open(self.path, "wb") as vocab_file:
+            vocab_file.write(vocab.dumps_binary())
+        return Vocab.load_binary(self.path)
+
+    def test_binary_round_trip(self):
+        rng = random.Random(0)
+        vocab = make_vocab(random_words(rng, 500) + ["café", "naïve", "Ünïcode"])
+        mapped = self.write_binary(vocab)
+
+        self.assertEqual(sorted(mapped.iterwords()), sorted(vocab.iterwords()))
+        self.assertEqual(dict(mapped._wordfreq.items()), vocab._wordfreq)
+        for word in vocab._wordfreq:
+            self.assertIn(word, mapped._wordfreq)
+            self.assertEqual(
+                mapped.relative_frequency(word), vocab.relative_frequency(word)
+            )
+        for word in vocab.iterwords():
+            self.assertIn(word, mapped._words)
+        self.assertNotIn("zzzzzzzz", mapped._words)
+        self.assertNotIn("zzzzzzzz", mapped._wordfreq)
+        self.assertEqual(mapped._wordfreq.get("zzzzzzzz", 0), 0)
+        with self.assertRaises(KeyError):
+            mapped._wordfreq["zzzzzzzz"]
+        self.assertEqual(mapped._total_sample_ct, vocab._total_sample_ct)
+
+    def test_binary_frequency_table(self):
+        vocab = make_vocab(["alpha", "Beta", "beta", "Gamma"])
+        mapped = self.write_binary(vocab)
+        # read from the mapped file rather than decoded up front
+        table = mapped.frequency_table()
+        self.assertNotIsInstance(table, FrequencyTable)
+        for word in vocab.iterwords():
+            idx = table.index(word)
+            self.assertEqual(table.words[idx], vocab.frequency_table().canonical(word))
+            self.assertEqual(table.frequency_at(idx), vocab.relative_frequency(word))
+        with self.assertRaises(KeyError):
+            table.index("zzzzzzzz")
+
+        mapped.learn_word("delta")
+        self.assertIsInstance(mapped.frequency_table(), FrequencyTable)
+        self.assertEqual(mapped.relative_frequency("Gamma"), 1)
+
+    def test_write_binary_leaves_mapped_file_intact(self):
+        mapped = self.write_binary(make_vocab(["alpha", "beta"]))
+        make_vocab(["gamma", "delta", "epsilon"]).write_binary(self.path)
+        # still reads the file it mapped, rather than the one replacing it
+        self.assertEqual(sorted(mapped.iterwords()), ["alpha", "beta"])
+        self.assertEqual(
+            sorted(Vocab.load_binary(self.path).iterwords()),
+            ["delta", "epsilon", "gamma"],
+        )
+        self.assertFalse(os.path.exists(self.path + ".tmp"))
+
+    def test_binary_pickles_by_path(self):
+        mapped = self.write_binary(make_vocab(["alpha", "Beta", "gamma"]))
+        unpickled = pickle.loads(pickle.dumps(mapped))
+        self.assertEqual(sorted(unpickled.iterwords()), ["Beta", "alpha", "gamma"])
+        self.assertEqual(unpickled.relative_frequency("beta"), 2 / 3)
+        self.assertNotIn(b"gamma", pickle.dumps(mapped))
+
+    def test_binary_pickles_data_once_replaced(self):
+        mapped = self.write_binary(make_vocab(["alpha", "Beta", "gamma"]))
+        pickled = pickle.dumps(mapped)
+        make_vocab(["delta"]).write_binary(self.path)
+        # workers get the vocab the parent has mapped, not the new file
+        unpickled = pickle.loads(pickle.dumps(mapped))
+        self.assertEqual(sorted(unpickled.iterwords()), ["Beta", "alpha", "gamma"])
+        self.assertEqual(unpickled.relative_frequency("beta"), 2 / 3)
+        # and a pickle of the path refuses to map a file it wasn't made from
+        with self.assertRaises(ValueError):
+            pickle.loads(pickled)
+
+    def test_consume_after_load_binary(self):
+        mapped = self.write_binary(make_vocab(["alpha", "Beta"]))
+        generation = mapped.generation
+        mapped.consume_md_str("beta delta")
+        self.assertEqual(mapped.generation, generation + 1)
+        self.assertEqual(sorted(mapped.iterwords()), ["Beta", "alpha", "beta", "delta"])
+        self.assertEqual(mapped._wordfreq["beta"], 3)
+        self.assertEqual(mapped._wordfreq["delta"], 1)
+
+    def test_frequency_table(self):
+        vocab = make_vocab(["alpha", "Alpha", "ALPHA", "beta", "Gamma"])
+        table = vocab.frequency_table()
+        self.assertEqual(table.words, ["alpha", "beta", "gamma"])
+        for word in ["alpha", "Alpha", "ALPHA"]:
+            self.assertEqual(table.canonical(word), "alpha")
+            self.assertEqual(vocab.relative_frequency(word), 3 / 5)
+        self.assertEqual(vocab.relative_frequency("Gamma"), 1)
+        self.assertEqual(vocab.relative_frequency("gamma"), 1)
+        self.assertNotIn("GAMMA", table.variants)
+        # lowercase words are stored once
+        self.assertIs(
+            [w for w in vocab.iterwords() if w == "beta"][0], table.canonical("beta")
+        )
+
+    def test_frequency_table_tracks_consumed_words(self):
+        vocab = make_vocab(["alpha", "beta"])
+        self.assertEqual(vocab.relative_frequency("alpha"), 1 / 2)
+        vocab.consume_md_str("Alpha alpha Delta")
+        self.assertEqual(vocab.relative_frequency("Alpha"), 1)
+        self.assertEqual(vocab.relative_frequency("delta"), 1 / 3)
+        self.assertEqual(vocab.frequency_table().canonical("Delta"), "delta")
+
+    def test_md_words_match_reference(self):
+        rng = random.Random(1)
+        pieces = ["word", "Ab", "xyz", "3", " ", "  ", "\n", "\t", "[", "]", "(", ")"]
+        pieces += ["[data:", "](", "http", "://", ")]", ".", "_", "`", "-", "é", "٣"]
+        for _ in range(2000):
+            md_str = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 30)))
+            expected = reference_md_words(md_str)
+            self.assertEqual(list(iter_md_words([md_str])), expected, repr(md_str))
+            self.assertEqual(
+                list(iter_md_words(io.StringIO(md_str))), expected, repr(md_str)
+            )
+
+    def test_consume_counts_matches_consume_md_str(self):
+        docs = [
+            "Some [notes](http://example.com/x) about `code`, and Notes.",
+            "more notes: see https://example.com/a) and 3rd item 42",
+            "[data:image/png;base64,abc] Some more words here",
+        ]
+        consumed = Vocab()
+        for doc in docs:
+            consumed.consume_md_str(doc)
+        counts = Counter()
+        for doc in docs:
+            count_md_str(doc, counts)
+        counted = Vocab()
+        counted.consume_counts(counts)
+
+        self.assertEqual(counts["notes"], 2)
+        self.assertEqual(counts["Notes"], 1)
+        self.assertEqual(set(counted.iterwords()), set(consumed.iterwords()))
+        self.assertEqual(counted._wordfreq, consumed._wordfreq)
+        self.assertEqual(counted._total_sample_ct, consumed._total_sample_ct)
+
+    def test_learn_word_matches_consume_counts(self):
+        rng = random.Random(2)
+        words = random_words(rng, 200)
+        learned = make_vocab(words)
+        table = learned.frequency_table()
+        consumed = make_vocab(words)
+        typed = [rng.choice(words) for _ in range(300)] + ["Novel", "novel", "Aa"]
+        typed += [words[-1]] * 400
+        generation = learned.generation
+        for word in typed:
+            learned.learn_word(word)
+        consumed.consume_counts(Counter(typed))
+
+        # learned words are logged rather than changing the generation
+        self.assertEqual(learned.generation, generation)
+        self.assertEqual(learned.learned_since(0), [(word, 1) for word in typed])
+        self.assertIs(learned.frequency_table(), table)
+        self.assertEqual(set(learned.iterwords()), set(consumed.iterwords()))
+        self.assertEqual(learned._wordfreq, consumed._wordfreq)
+        self.assertEqual(learned._total_sample_ct, consumed._total_sample_ct)
+        self.assertEqual(learned._max_sample_ct, consumed._max_sample_ct)
+        for word in list(consumed.iterwords()) + list(consumed._wordfreq):
+            self.assertAlmostEqual(
+                learned.relative_frequency(word), consumed.relative_frequency(word)
+            )
+            self.assertEqual(
+                table.canonical(word), consumed.frequency_table().canonical(word)
+            )
+
+    def test_learned_log_is_trimmed(self):
+        vocab = Vocab()
+        for i in range(3 * LEARNED_LOG_SIZE):
+            vocab.learn_word("word" + "x" * (i % 7))
+        self.assertEqual(vocab.learned_ct(), 3 * LEARNED_LOG_SIZE)
+        self.assertLessEqual(len(vocab.learned), LEARNED_LOG_SIZE)
+        self.assertEqual(vocab.learned_since(0), None)
+        self.assertEqual(
+            vocab.learned_since(vocab.learned_ct() - 2),
+            [
+                ("word" + "x" * (i % 7), 1)
+                for i in range(3 * LEARNED_LOG_SIZE - 2, 3 * LEARNED_LOG_SIZE)
+            ],
+        )
+
+    def test_learn_word_into_empty_and_mapped(self):
+        vocab = Vocab()
+        vocab.learn_word("Alpha")
+        self.assertEqual(vocab.relative_frequency("alpha"), 1)
+
+        mapped = self.write_binary(make_vocab(["alpha", "beta"]))
+        mapped.learn_word("Beta")
+        self.assertEqual(mapped.relative_frequency("Beta"), 1)
+        self.assertEqual(mapped.relative_frequency("alpha"), 1 / 3)
+
+    def test_prune(self):
+        vocab = make_vocab(["alpha", "Alpha", "beta", "gamma", "delta", "Delta"])
+        vocab.prune(min_count=4)
+        self.assertEqual(sorted(vocab.iterwords()), ["Delta", "delta", "gamma"])
+        self.assertEqual(vocab._wordfreq, {"gamma": 4, "delta": 6})
+        self.assertEqual(vocab.relative_frequency("gamma"), 4 / 6)
+
+        vocab = make_vocab(["alpha", "beta", "gamma", "delta"])
+        vocab.prune(max_size=2)
+        self.assertEqual(sorted(vocab.iterwords()), ["delta", "gamma"])
+        self.assertEqual(vocab.substring_index().candidates("alp"), [])
+
+    def test_empty_binary(self):
+        mapped = self.write_binary(Vocab())
+        self.assertEqual(list(mapped.iterwords()), [])
+        self.assertNotIn("alpha", mapped._words)
+
+
+if __name__ == "__main__":
+    unittest.main()